@@ -34,6 +34,84 @@ def signed_distance_to_curve(pt, curve):
             sign = -1 if cross > 0 else 1
     return min_dist * sign
 
+# -----------------------------
+# Batched signed distance to curve
+# -----------------------------
+class CurvePrecomp:
+    """
+    Per-curve segment data reused across batched distance queries.
+    Same sign convention as signed_distance_to_curve.
+    """
+
+    def __init__(self, curve):
+        pts = np.asarray(curve, dtype=np.float32)
+        self.A = pts[:-1]                                   # (S,2) segment starts
+        self.AB = pts[1:] - pts[:-1]                        # (S,2) segment vectors
+        ab_sq = np.einsum('sd,sd->s', self.AB, self.AB)
+        # Degenerate segments project onto their start point (t=0)
+        self.inv_ab_sq = np.divide(1.0, ab_sq, out=np.zeros_like(ab_sq), where=ab_sq > 0)
+
+        # "Draw a line, count crossings": a single segment needs no per-segment search
+        self.single_segment = len(pts) == 2 and ab_sq[0] > 0
+        if self.single_segment:
+            (ax, ay), (bx, by) = pts[0], pts[1]
+            inv_len = 1.0 / np.sqrt(ab_sq[0])
+            self.seg_len = 1.0 / inv_len
+            self.tangent = np.array([bx - ax, by - ay], dtype=np.float32) * inv_len
+            # Normal chosen so that (P-A)@normal is positive on the "below" side
+            self.normal = np.array([by - ay, -(bx - ax)], dtype=np.float32) * inv_len
+
+
+def _signed_squared_distance_single_segment(points, pre):
+    AP = points - pre.A[0]
+    d_line = AP @ pre.normal
+    # Distance past either endpoint along the segment direction (0 inside the span)
+    t = AP @ pre.tangent
+    overshoot = np.maximum(np.maximum(t - pre.seg_len, -t), 0.0)
+    dist_sq = d_line * d_line + overshoot * overshoot
+    return np.where(d_line < 0, -dist_sq, dist_sq)
+
+
+def signed_squared_distance_to_curve_batch(points, curve):
+    """
+    Like signed_distance_to_curve_batch but returns sign * distance**2 (no sqrt).
+    Compare against eps**2 instead of eps; the sign is the same as the signed distance.
+    """
+    pre = curve if isinstance(curve, CurvePrecomp) else CurvePrecomp(curve)
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+
+    if pre.single_segment:
+        return _signed_squared_distance_single_segment(points, pre)
+
+    AP = points[:, None, :] - pre.A[None, :, :]             # (N,S,2)
+    # einsum contracts the coordinate axis without an (N,S,2) product temporary
+    t = np.clip(np.einsum('nsd,sd->ns', AP, pre.AB) * pre.inv_ab_sq, 0.0, 1.0)
+    diff = AP - t[..., None] * pre.AB
+    dist_sq = np.einsum('nsd,nsd->ns', diff, diff)          # (N,S)
+
+    # First nearest segment wins, as in the scalar loop
+    nearest = np.argmin(dist_sq, axis=1)
+    rows = np.arange(len(points))
+    ap = AP[rows, nearest]
+    ab = pre.AB[nearest]
+    cross = ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]
+    min_dist_sq = dist_sq[rows, nearest]
+    return np.where(cross > 0, -min_dist_sq, min_dist_sq)
+
+
+def signed_sqrt(signed_sq):
+    """Converts sign * d**2 values back to signed distances (for printouts/diagnostics)."""
+    return np.copysign(np.sqrt(np.abs(signed_sq)), signed_sq)
+
+
+def signed_distance_to_curve_batch(points, curve):
+    """
+    Vectorized signed_distance_to_curve for an (N,2) array of points.
+    `curve` may be an Nx2 array or a CurvePrecomp built once and reused.
+    Returns an (N,) float32 array.
+    """
+    return signed_sqrt(signed_squared_distance_to_curve_batch(points, curve))
+
 # -----------------------------
 # Classify region
 # -----------------------------
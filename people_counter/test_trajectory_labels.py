@@ -1,7 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from modules.tracker_logic import signed_distance_to_curve
 from modules.orientation import auto_orient_curve
+from modules.tracker_logic import signed_sqrt
+from utils.helper_functions import label_and_crossings
+from utils.viz_tools import get_plot_axes
 
 def test_trajectory_labels(curve, trajectory, eps=3.0, min_crossings=1, sample_sz=10, IN_direction=None, plot=True):
     """
@@ -30,7 +32,7 @@ def test_trajectory_labels(curve, trajectory, eps=3.0, min_crossings=1, sample_s
     labeled_points : list of tuples
         Each tuple: (point, signed_distance, oriented_distance, label)
     """
-    trajectory_np = np.array(trajectory, dtype=np.float32)
+    trajectory_np = np.asarray(trajectory, dtype=np.float32)
 
     # Determine orientation
     if IN_direction is None or IN_direction == 'auto':
@@ -42,28 +44,15 @@ def test_trajectory_labels(curve, trajectory, eps=3.0, min_crossings=1, sample_s
         orientation = 1 if IN_direction in ["toward_cam", "left", "right"] else -1
         print(f"Using orientation from config IN_direction='{IN_direction}':", orientation)
 
-    # Initialize labeling
-    labeled_points = []
+    # Label all points at once; the label flips at every crossing
+    dists_sq, oriented_dists_sq, labels, _ = label_and_crossings(
+        curve, trajectory_np, eps=eps, orientation=orientation, mode="crossing"
+    )
 
-    first_oriented_dist = signed_distance_to_curve(trajectory_np[0], curve) * orientation
-    prev_oriented_dist = first_oriented_dist
-
-    # Set initial label
-    current_label = "IN" if first_oriented_dist > 0 else "OUT"
-
-    for pt in trajectory_np:
-        dist = signed_distance_to_curve(pt, curve)
-        oriented_dist = dist * orientation
-
-        # Detect crossing (sign change beyond eps)
-        if prev_oriented_dist * oriented_dist < 0 and abs(oriented_dist) > eps:
-            # Flip label
-            current_label = "IN" if current_label == "OUT" else "OUT"
-
-        labeled_points.append((pt, dist, oriented_dist, current_label))
-        prev_oriented_dist = oriented_dist
-
-        print(f"{pt} -> dist={dist:.2f}, oriented={oriented_dist:.2f}, label={current_label}")
+    # Distances are kept squared by the labeling core; take the root only for display
+    labeled_points = list(zip(trajectory_np, signed_sqrt(dists_sq), signed_sqrt(oriented_dists_sq), labels))
+    for pt, dist, oriented_dist, label in labeled_points:
+        print(f"{pt} -> dist={dist:.2f}, oriented={oriented_dist:.2f}, label={label}")
 
     if plot:
         plot_labeled_trajectory(trajectory_np, curve, labeled_points)
@@ -74,35 +63,35 @@ def plot_labeled_trajectory(trajectory_np, curve, labeled_points, save_path=None
     """
     Plots trajectory with points colored by IN/OUT status.
     """
-    plt.figure(figsize=(8, 6))
+    fig, ax = get_plot_axes()
 
     # Plot curve
     if curve is not None:
-        curve_np = np.array(curve, dtype=np.float32)
-        plt.plot(curve_np[:, 0], curve_np[:, 1], 'y-', linewidth=2, label='Counting Curve')
+        curve_np = np.asarray(curve, dtype=np.float32)
+        ax.plot(curve_np[:, 0], curve_np[:, 1], 'y-', linewidth=2, label='Counting Curve')
 
     # Plot trajectory with colors
     for idx, (pt, _, _, label) in enumerate(labeled_points):
         color = 'green' if label == 'IN' else 'red'
-        plt.scatter(pt[0], pt[1], color=color, s=50)
+        ax.scatter(pt[0], pt[1], color=color, s=50)
         if idx > 0:
-            plt.plot([labeled_points[idx-1][0][0], pt[0]],
+            ax.plot([labeled_points[idx-1][0][0], pt[0]],
                      [labeled_points[idx-1][0][1], pt[1]],
                      color=color, linewidth=2)
 
     # Mark start and end
-    plt.scatter(trajectory_np[0, 0], trajectory_np[0, 1], color='blue', s=100, label='Start')
-    plt.scatter(trajectory_np[-1, 0], trajectory_np[-1, 1], color='black', s=100, label='End')
+    ax.scatter(trajectory_np[0, 0], trajectory_np[0, 1], color='blue', s=100, label='Start')
+    ax.scatter(trajectory_np[-1, 0], trajectory_np[-1, 1], color='black', s=100, label='End')
 
-    plt.gca().invert_yaxis()
-    plt.xlabel("X position (pixels)")
-    plt.ylabel("Y position (pixels)")
-    plt.title("Trajectory with IN/OUT Labeling")
-    plt.legend()
-    plt.grid(True)
+    ax.invert_yaxis()
+    ax.set_xlabel("X position (pixels)")
+    ax.set_ylabel("Y position (pixels)")
+    ax.set_title("Trajectory with IN/OUT Labeling")
+    ax.legend()
+    ax.grid(True)
 
     if save_path:
-        plt.savefig(save_path, bbox_inches='tight')
+        fig.savefig(save_path, bbox_inches='tight')
         print(f"✅ Plot saved to: {save_path}")
     else:
         plt.show()
@@ -145,7 +134,7 @@ if __name__ == "__main__":
     # Run test
     labeled_points = test_trajectory_labels(
         curve=curve_points,
-        trajectory=trajectory_example,
+        trajectory=trajectory_np,
         sample_sz=10,
         IN_direction=IN_direction
     )
\ No newline at end of file
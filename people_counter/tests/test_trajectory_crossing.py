@@ -51,14 +51,18 @@ inside_region = cm.build_inside_region(
 # -------------------------------
 # Check trajectory points against polygon
 # -------------------------------
-entered = False
-entry_frame = None
-for idx, pt in enumerate(trajectory):
-    # pointPolygonTest >0 means inside, 0=on edge, <0=outside
-    result = cv2.pointPolygonTest(inside_region.astype(np.int32), tuple(pt), measureDist=False)
-    if result >= 0 and not entered:
-        entered = True
-        entry_frame = idx
+# Rasterize the region once (edge pixels included, like pointPolygonTest >= 0),
+# then look every trajectory point up in the mask
+region_mask = np.zeros((h, w), np.uint8)
+cv2.fillPoly(region_mask, [inside_region.astype(np.int32)], 1)
+
+pts_i = trajectory.astype(np.int32)
+in_frame = (pts_i[:, 0] >= 0) & (pts_i[:, 0] < w) & (pts_i[:, 1] >= 0) & (pts_i[:, 1] < h)
+inside = np.zeros(len(pts_i), dtype=bool)
+inside[in_frame] = region_mask[pts_i[in_frame, 1], pts_i[in_frame, 0]].astype(bool)
+
+entered = bool(inside.any())
+entry_frame = int(np.argmax(inside)) if entered else None
 
 print(f"Trajectory entered inside region: {entered}")
 if entered:
@@ -73,18 +77,16 @@ canvas = np.zeros((h, w, 3), dtype=np.uint8) + 30
 cv2.polylines(canvas, [inside_region.astype(np.int32)], True, (0, 255, 0), 2, cv2.LINE_AA)
 cv2.fillPoly(canvas, [inside_region.astype(np.int32)], (0, 200, 0, 50))
 
-# Draw curve
-for i, p in enumerate(curve_points):
-    cv2.circle(canvas, (int(p[0]), int(p[1])), 3, (0, 255, 255), -1)
-    if i > 0:
-        cv2.line(canvas, (int(curve_points[i-1,0]), int(curve_points[i-1,1])),
-                 (int(p[0]), int(p[1])), (0, 255, 255), 1)
+# Draw curve (one polyline for the edges; each vertex as a one-point contour,
+# which polylines renders as a filled dot of diameter == thickness)
+curve_i = curve_points.astype(np.int32)
+cv2.polylines(canvas, [curve_i], False, (0, 255, 255), 1, cv2.LINE_AA)
+cv2.polylines(canvas, list(curve_i[:, None]), True, (0, 255, 255), 6)
 
 # Draw trajectory
-for i in range(1, len(trajectory)):
-    cv2.line(canvas, (int(trajectory[i-1,0]), int(trajectory[i-1,1])),
-             (int(trajectory[i,0]), int(trajectory[i,1])), (255,0,0), 2)
-    cv2.circle(canvas, (int(trajectory[i,0]), int(trajectory[i,1])), 2, (255,0,0), -1)
+trajectory_i = trajectory.astype(np.int32)
+cv2.polylines(canvas, [trajectory_i], False, (255,0,0), 2)
+cv2.polylines(canvas, list(trajectory_i[1:, None]), True, (255,0,0), 4)
 
 cv2.putText(canvas, "Inside Region (green) + Trajectory (blue)", (10,20),
             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,255,255), 1)
@@ -1,4 +1,56 @@
-from modules.tracker_logic import signed_distance_to_curve
+import numpy as np
+from modules.tracker_logic import signed_squared_distance_to_curve_batch
+
+def label_and_crossings(curve, trajectory, eps=3.0, orientation=1, mode="crossing"):
+    """
+    Shared labeling core: signed squared distances, IN/OUT labels and crossings for a whole trajectory.
+
+    Parameters
+    ----------
+    curve : np.ndarray or CurvePrecomp
+        Nx2 array of curve points (or a precomputed curve).
+    trajectory : np.ndarray
+        Nx2 array of trajectory points.
+    eps : float
+        A sign change only counts as a crossing if the new point is farther than eps from the curve.
+    orientation : int
+        +1 or -1, multiplier applied to the signed distances.
+    mode : str
+        'crossing': start from the side of the first point and flip the label at every crossing.
+        'side': label each point by the side it is on (IN if oriented distance > 0).
+
+    Returns
+    -------
+    dist_sq : np.ndarray
+        Signed squared distance (sign * d**2) of each point to the curve;
+        use modules.tracker_logic.signed_sqrt to get distances for display.
+    oriented_dist_sq : np.ndarray
+        dist_sq * orientation.
+    labels : list of str
+        'IN' or 'OUT' for each point.
+    crossings : np.ndarray
+        Indices of the points at which a crossing was detected.
+    """
+    trajectory_np = np.asarray(trajectory, dtype=np.float32)
+    dist_sq = signed_squared_distance_to_curve_batch(trajectory_np, curve)
+    oriented_dist_sq = dist_sq * orientation
+
+    # Crossing = sign change w.r.t. the previous point, beyond eps (compared squared)
+    eps_sq = eps * eps
+    flips = (oriented_dist_sq[:-1] * oriented_dist_sq[1:] < 0) & (np.abs(oriented_dist_sq[1:]) > eps_sq)
+    crossings = np.flatnonzero(flips) + 1
+
+    if mode == "crossing":
+        start_in = len(oriented_dist_sq) > 0 and oriented_dist_sq[0] > 0
+        n_flips = np.concatenate(([0], np.cumsum(flips)))[:len(oriented_dist_sq)]
+        is_in = (n_flips % 2 == 0) == start_in
+    elif mode == "side":
+        is_in = oriented_dist_sq > 0
+    else:
+        raise ValueError(f"Unknown labeling mode: {mode}")
+
+    labels = np.where(is_in, "IN", "OUT").tolist()
+    return dist_sq, oriented_dist_sq, labels, crossings
 
 def label_trajectory(curve, trajectory, orientation):
     """
@@ -12,9 +64,5 @@ def label_trajectory(curve, trajectory, orientation):
     Returns:
         list of str: 'IN' or 'OUT' for each trajectory point.
     """
-    labels = []
-    for pt in trajectory:
-        dist = signed_distance_to_curve(pt, curve)
-        oriented_dist = dist * orientation
-        labels.append("IN" if oriented_dist < 0 else "OUT")
-    return labels
+    _, oriented_dist_sq, _, _ = label_and_crossings(curve, trajectory, orientation=orientation, mode="side")
+    return np.where(oriented_dist_sq < 0, "IN", "OUT").tolist()
@@ -1,7 +1,37 @@
+import os
+import sys
 import cv2
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
 
+# No display (server, container, worker): use the non-interactive Agg backend, which also skips GUI backend probing.
+# A backend chosen by the user (MPLBACKEND, e.g. the inline backend of a remote Jupyter kernel) is left alone.
+HEADLESS = sys.platform.startswith('linux') and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+if HEADLESS and 'MPLBACKEND' not in os.environ:
+    matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# Built-in backends that only render to files (plt.show() does nothing with them)
+NON_INTERACTIVE_BACKENDS = frozenset({'agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template'})
+
+# Figure shared by the plot helpers; reused instead of allocating a new canvas per call
+_plot_fig = None
+_plot_ax = None
+
+
+def get_plot_axes():
+    """
+    Returns the shared (fig, ax) pair, cleared and ready to draw on.
+    A new figure is only created on first use or after the previous one was closed
+    (e.g. by dismissing the plt.show() window).
+    """
+    global _plot_fig, _plot_ax
+    if _plot_fig is None or not plt.fignum_exists(_plot_fig.number):
+        _plot_fig, _plot_ax = plt.subplots(figsize=(8, 6))
+    else:
+        _plot_ax.clear()
+    return _plot_fig, _plot_ax
+
 
 def plot_trajectory(trajectory_data, curve=None, save_path=None):
     """
@@ -15,7 +45,7 @@ def plot_trajectory(trajectory_data, curve=None, save_path=None):
     curve : list or np.ndarray, optional
         List/array of (x, y) points representing the counting curve.
     save_path : str, optional
-        File path to save the plot. If None, displays the plot.
+        File path to save the plot. If None, displays the plot (headless: nothing to display, a warning is printed).
     """
 
     path = trajectory_data.get("path", None)
@@ -25,34 +55,36 @@ def plot_trajectory(trajectory_data, curve=None, save_path=None):
         print("⚠️ No trajectory data to plot.")
         return
 
-    path_np=np.array(path, dtype=np.float32)
+    path_np=np.asarray(path, dtype=np.float32)
 
     if path_np.shape[0]==1:
         print("⚠️ Trajectory contains only one point; plotting single point.")
 
     # Create plot
-    plt.figure(figsize=(8, 6))
-    plt.plot(path_np[:, 0], path_np[:, 1], 'bo-', label=f'Trajectory (tracker_id={id})')
-    plt.scatter(path_np[0, 0], path_np[0, 1], color='green', s=100, label='Start')
-    plt.scatter(path_np[-1, 0], path_np[-1, 1], color='red', s=100, label='End')
-    plt.gca().invert_yaxis()  # Correct for image coordinates (top-left origin)
+    fig, ax = get_plot_axes()
+    ax.plot(path_np[:, 0], path_np[:, 1], 'bo-', label=f'Trajectory (tracker_id={id})')
+    ax.scatter(path_np[0, 0], path_np[0, 1], color='green', s=100, label='Start')
+    ax.scatter(path_np[-1, 0], path_np[-1, 1], color='red', s=100, label='End')
+    ax.invert_yaxis()  # Correct for image coordinates (top-left origin)
 
     # Overlay curve if provided
     if curve is not None and len(curve)>0:
-        curve_np=np.array(curve, dtype=np.float32)
-        plt.plot(curve_np[:, 0], curve_np[:, 1], 'y-', linewidth=2, label='Counting Curve')
+        curve_np=np.asarray(curve, dtype=np.float32)
+        ax.plot(curve_np[:, 0], curve_np[:, 1], 'y-', linewidth=2, label='Counting Curve')
 
     # Labels and styling
-    plt.xlabel("X position (pixels)")
-    plt.ylabel("Y position (pixels)")
-    plt.title("Tracked Person Trajectory")
-    plt.legend()
-    plt.grid(True)
+    ax.set_xlabel("X position (pixels)")
+    ax.set_ylabel("Y position (pixels)")
+    ax.set_title("Tracked Person Trajectory")
+    ax.legend()
+    ax.grid(True)
 
     # Save or show
     if save_path:
-        plt.savefig(save_path, bbox_inches='tight')
+        fig.savefig(save_path, bbox_inches='tight')
         print(f"✅ Trajectory plot saved to: {save_path}")
+    elif plt.get_backend().lower() in NON_INTERACTIVE_BACKENDS:
+        print("⚠️ No display available; pass save_path to save the trajectory plot.")
     else:
         plt.show()
 
@@ -60,25 +92,59 @@ def plot_trajectory(trajectory_data, curve=None, save_path=None):
 # -----------------------------
 # 2️⃣ Real-time trajectory overlay
 # -----------------------------
+class TrailBuffer:
+    """
+    Preallocated trail of the latest max_points (x, y) points of a track.
+
+    Every point is written twice (at i and i + max_points), so the newest points are
+    always one contiguous (count, 1, 2) int32 view that cv2.polylines takes as-is:
+    no per-frame array allocation, copy or reshape.
+    """
+
+    def __init__(self, max_points=30):
+        self.max_points = max_points
+        self.count = 0
+        self._head = 0  # next write slot in [0, max_points)
+        self._buf = np.zeros((2 * max_points, 1, 2), np.int32)
+
+    def append(self, pt):
+        self._buf[self._head, 0] = pt
+        self._buf[self._head + self.max_points, 0] = pt
+        self._head = (self._head + 1) % self.max_points
+        self.count = min(self.count + 1, self.max_points)
+
+    def __len__(self):
+        return self.count
+
+    def view(self):
+        start = self._head + self.max_points - self.count
+        return self._buf[start:start + self.count]
+
+
 def draw_live_trajectory(frame, path, color=(0, 255, 255), thickness=2, max_points=30):
     """
     Draw a trailing trajectory for the selected person on the video frame.
 
     Args:
         frame (np.ndarray): The current video frame (BGR)
-        path (list[tuple]): List of (x, y) coordinates for this track
+        path (TrailBuffer | list[tuple]): Trail buffer (preferred, allocation-free) or
+            list of (x, y) coordinates for this track
         color (tuple): BGR color for the trajectory line
         thickness (int): Line thickness
-        max_points (int): How many of the latest points to draw (for smooth trails)
+        max_points (int): How many of the latest points to draw (for smooth trails);
+            ignored for a TrailBuffer, which already holds only its latest points
     """
     if len(path) < 2:
         return frame
 
-    pts = np.array(path[-max_points:], np.int32).reshape((-1, 1, 2))
+    if isinstance(path, TrailBuffer):
+        pts = path.view()
+    else:
+        pts = np.array(path[-max_points:], np.int32).reshape((-1, 1, 2))
     cv2.polylines(frame, [pts], isClosed=False, color=color, thickness=thickness)
 
     # Draw last point (current position)
-    cv2.circle(frame, tuple(pts[-1][0]), 5, (0, 255, 0), -1)
+    cv2.circle(frame, (int(pts[-1, 0, 0]), int(pts[-1, 0, 1])), 5, (0, 255, 0), -1)
 
     return frame
 
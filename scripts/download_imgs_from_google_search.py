@@ -7,8 +7,13 @@ def download_images(root_dir, query, num_images):
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
-    google_crawler = GoogleImageCrawler(storage={'root_dir': folder_path})
-    google_crawler.crawl(keyword=query, max_num=num_images)
+    # Downloads are I/O bound: several downloader threads fetch images concurrently
+    google_crawler = GoogleImageCrawler(storage={'root_dir': folder_path},
+                                        feeder_threads=1, parser_threads=2, downloader_threads=8)
+    google_crawler.crawl(keyword=query, max_num=num_images,
+                         filters={'type': 'photo'},  # Photos only, skips clip art/line drawings
+                         min_size=(200, 200),  # Skip thumbnails too small to be useful
+                         file_idx_offset='auto')  # Continue numbering after files from previous runs
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+from ultralytics import YOLO
+
+
+def export_engine(path="yolo12n.pt"):
+    """
+    Exports the detection model to TensorRT once (writes e.g. yolo12n.engine next to the weights);
+    the scripts pick the engine up when it exists.
+    FP16, dynamic shapes up to a batch of 16 at 640px, so single frames and image batches share one engine.
+
+    Args:
+        path (str): The PyTorch weights to export.
+
+    Returns:
+        str: Path of the exported engine.
+    """
+    # Load the detection model
+    model = YOLO(path)
+    return model.export(format="engine", half=True, dynamic=True, batch=16, imgsz=640, workspace=4)
+
+
+if __name__ == "__main__":
+    export_engine()
@@ -1,101 +1,284 @@
 # Import required libraries
+import os
 import cv2
+import queue
+import threading
+import numpy as np
+import torch
 from ultralytics import YOLO
 import cvzone
 
-# Load YOLO V12 model
-model = YOLO('yolo12n.pt')
+from export_engine import export_engine
+
+# Load YOLO V12 model: FP16 TensorRT engine on GPU (exported once, then reused), PyTorch weights otherwise
+USE_TRT = torch.cuda.is_available()
+ENGINE_PATH = 'yolo12n.engine'
+if USE_TRT:
+    torch.backends.cudnn.benchmark = True
+    if not os.path.exists(ENGINE_PATH):
+        export_engine('yolo12n.pt')
+    model = YOLO(ENGINE_PATH)
+else:
+    model = YOLO('yolo12n.pt')
 names=model.names
-# Define vertical line's X position
-line_x = 500
-line_y = 200
 
-# Track previous center positions
-track_history = {}
+# Every frame is resized to this size, so the counting lines are fixed
+FRAME_W, FRAME_H = 1020, 600
+LINE_X = FRAME_W // 2         # vertical line
+LINE_Y = FRAME_H // 2 + 60    # horizontal (counting) line
+
+# Both lines pre-drawn once; OR-ing this in paints them white on every frame
+line_overlay = np.zeros((FRAME_H, FRAME_W, 3), dtype=np.uint8)
+cv2.line(line_overlay, (LINE_X, 0), (LINE_X, FRAME_H), (255, 255, 255), 2)
+cv2.line(line_overlay, (0, LINE_Y), (FRAME_W, LINE_Y), (255, 255, 255), 2)
+
+# Run YOLO on every Nth frame; in between, tracks are moved along their last velocity
+DETECT_EVERY = 3
+
+# Per-track_id state (-1 = not seen yet); grown when a larger id shows up
+prev_cy = np.full(4096, -1, dtype=np.int32)    # center y used by the previous crossing test
+det_cx = np.full(4096, -1, dtype=np.int32)     # center at the last detection
+det_cy = np.full(4096, -1, dtype=np.int32)
+det_frame = np.zeros(4096, dtype=np.int32)     # frame of the last detection
+vel = np.zeros((4096, 2), dtype=np.float32)    # (dx, dy) per frame between the last two detections
+
+# Tracks from the last detection, propagated on the frames in between
+active_ids = np.empty(0, dtype=int)
+active_boxes = np.empty((0, 4), dtype=int)
+
+
+def grow_to(arr, size, fill):
+    """Returns arr padded with `fill` to at least `size` rows."""
+    if len(arr) >= size:
+        return arr
+    return np.concatenate((arr, np.full((size - len(arr),) + arr.shape[1:], fill, dtype=arr.dtype)))
 
 # IN/OUT counters
 in_count = 0
 out_count = 0
 
-in_ids, out_ids = [], []
+# Crossing logs, preallocated and doubled when full: in_ids rows are (track_id, frame), out_ids holds track ids
+in_ids = np.empty((16384, 2), dtype=np.int32)
+out_ids = np.empty(16384, dtype=np.int32)
+n_in = n_out = 0
+
+
+def append_rows(arr, n, rows):
+    """Writes rows at arr[n:]; returns the (possibly grown) array and the new row count."""
+    end = n + len(rows)
+    if end > len(arr):
+        arr = grow_to(arr, max(end, 2 * len(arr)), 0)
+    arr[n:end] = rows
+    return arr, end
+
+# Open video file or webcam through FFmpeg with hardware decoding (NVDEC/VAAPI/...) when available;
+# OpenCV falls back to software decoding if no accelerator can be used
+cap = cv2.VideoCapture("../data/videos/People Entering And Exiting Mall Stock Footage.mp4", cv2.CAP_FFMPEG,
+                       [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]) # Use 0 (and cv2.CAP_ANY) for webcam
+
+# SHOW=1 opens a preview window; otherwise (headless/benchmark runs) annotated frames go to OUTPUT_PATH
+SHOW = os.environ.get("SHOW", "0") == "1"
+OUTPUT_PATH = "counter_output.mp4"
+FPS = cap.get(cv2.CAP_PROP_FPS) or 30
+
+# Pipeline: reader thread (decode + resize) -> main thread (track + count) -> writer thread (draw + display)
+# Throughput is bounded by the slowest stage instead of the sum of all three.
+read_q = queue.Queue(maxsize=4)
+draw_q = queue.Queue(maxsize=4)
+stop_event = threading.Event()  # Set on ESC so every stage winds down
+
+# Preallocated resize outputs, reused round-robin. A buffer is only overwritten once every frame
+# that can still be in flight (both queues full + one frame in each stage) has been passed on.
+frame_bufs = np.empty((read_q.maxsize + draw_q.maxsize + 4, FRAME_H, FRAME_W, 3), dtype=np.uint8)
+
+
+def put_or_stop(q, item):
+    """Blocking put that gives up once the pipeline is stopping (avoids deadlock on a full queue)."""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
 
-# Open video file or webcam
-cap = cv2.VideoCapture("../data/videos/People Entering And Exiting Mall Stock Footage.mp4") # Use 0 for webcam
 
 # Define the mouse callback function
 def RGB(event, x, y, flags, param):
     if event == cv2.EVENT_MOUSEMOVE:
         print(f"Mouse moved to: [[{x}, {y}]]")
 
-# Create a named OpenCV window and set the mouse callback
-cv2.namedWindow("RGB")
-cv2.setMouseCallback("RGB", RGB)
-frame_count=0
-while True:
-    # Read video frame
-    ret, frame = cap.read()
-    if not ret:
-        break
-    frame_count += 1
-    if frame_count % 2 != 0:
+
+def reader():
+    """Reads and resizes frames; a None sentinel marks the end of the video."""
+    frame_count=0
+    while not stop_event.is_set():
+        # Read video frame
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_count += 1
+        # INTER_AREA: proper downsampling filter, written straight into a reused buffer
+        frame = cv2.resize(frame, (FRAME_W, FRAME_H), dst=frame_bufs[frame_count % len(frame_bufs)],
+                           interpolation=cv2.INTER_AREA)
+        put_or_stop(read_q, (frame_count, frame))
+    put_or_stop(read_q, None)
+
+
+def render_counters(in_count, out_count):
+    """Renders the IN/OUT boxes once; returns (rows, cols, pixels) patches to paste into frames."""
+    canvas = np.zeros((FRAME_H, FRAME_W, 3), dtype=np.uint8)
+    patches = []
+    for text, pos, color in ((f'IN: {in_count}', (40, 60), (0, 128, 0)), (f'OUT: {out_count}', (40, 100), (0, 0, 255))):
+        # putTextRect fills its whole box, so the patch does not depend on the frame underneath
+        _, (x1, y1, x2, y2) = cvzone.putTextRect(canvas, text, pos, scale=2, thickness=2, colorT=(255, 255, 255), colorR=color)
+        rows = slice(max(y1, 0), min(y2 + 1, FRAME_H))
+        cols = slice(max(x1, 0), min(x2 + 1, FRAME_W))
+        patches.append((rows, cols, canvas[rows, cols].copy()))
+    return patches
+
+
+def writer():
+    """Draws the annotations computed by the main thread and shows the frame (SHOW=1) or writes it to OUTPUT_PATH."""
+    if SHOW:
+        # Create a named OpenCV window and set the mouse callback (all GUI calls stay on this thread)
+        cv2.namedWindow("RGB")
+        cv2.setMouseCallback("RGB", RGB)
+    else:
+        out = cv2.VideoWriter(OUTPUT_PATH, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (FRAME_W, FRAME_H))
+    counts, counter_patches = None, []
+    while True:
+        item = draw_q.get()
+        if item is None:
+            break
+        frame, tracks, in_count, out_count = item
+
+        for track_id, (x1, y1, x2, y2), cx, cy, event in tracks:
+            if event == 'out':
+                cv2.circle(frame, (cx, cy), 4, (255, 0, 0), -1)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                cvzone.putTextRect(frame, f'{track_id}', (x1, y1), 1, 1)
+                continue
+            if event == 'in':
+                cv2.circle(frame,(cx,cy),4,(255,0,0),-1)
+            cv2.rectangle(frame,(x1,y1),(x2,y2),(0,255,0),2)
+            cvzone.putTextRect(frame,f'{track_id}',(x1,y1),1,1)
+
+        # Display counts using cvzone's putTextRect, re-rendered only when a count changes
+        if counts != (in_count, out_count):
+            counts, counter_patches = (in_count, out_count), render_counters(in_count, out_count)
+        for rows, cols, patch in counter_patches:
+            frame[rows, cols] = patch
+        cv2.bitwise_or(frame, line_overlay, dst=frame)
+
+        if not SHOW:
+            out.write(frame)
+            continue
+        # Show the frame
+        cv2.imshow("RGB", frame)
+        # Press ESC to exit
+        if cv2.waitKey(1) & 0xFF == 27:
+            stop_event.set()
+            break
+    if SHOW:
+        cv2.destroyAllWindows()
+    else:
+        out.release()
+
+
+reader_thread = threading.Thread(target=reader, daemon=True)
+writer_thread = threading.Thread(target=writer, daemon=True)
+reader_thread.start()
+writer_thread.start()
+
+# Main thread: tracking and counting (tracker state stays single-threaded)
+while not stop_event.is_set():
+    try:
+        item = read_q.get(timeout=0.1)
+    except queue.Empty:
         continue
-    frame = cv2.resize(frame, (1020, 600))
-    line_x=frame.shape[1]//2
-    line_y=frame.shape[0]//2 + 60
-
-    # Detect and track persons (class 0)
-    results = model.track(frame, persist=True, classes=[0], verbose=False)
-    # annotated_frame = results[0].plot()
-
-    if results[0].boxes.id is not None:
-        ids = results[0].boxes.id.cpu().numpy().astype(int)
-        boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
-        class_ids = results[0].boxes.cls.int().cpu().tolist()
-        # print("Detected: ", len(ids), " | ", ids)
-        for track_id, box, class_id in zip(ids,boxes,class_ids):
-            x1,y1,x2,y2=box
-            name=names[class_id]
-            cx=int((x1+x2)/2)
-            cy= y1 #(y1+y2)//2 #y2-2
-            rectangle_rgb = (255,0,0)
-            if track_id == 7:
-                print(f"{cx},{cy}")
-            #     rectangle_rgb = (0,0,255)
-            #     # print(f"Tracking ===>>> {track_id} | {line_y} | box: {box} | cy: {cy}")
-            #     cv2.circle(frame,(cx,cy),4,(255,0,0),-1)
-            #     cv2.rectangle(frame,(x1,y1),(x2,y2),rectangle_rgb,2)
-            #     cvzone.putTextRect(frame,f'{track_id}',(x1,y1),1,1)
-
-            if track_id in track_history:
-                prev_cx, prev_cy = track_history[track_id]
-                if (prev_cy < line_y < cy):
-                    in_count += 1
-                    in_ids.append((track_id, frame_count))
-                    cv2.circle(frame,(cx,cy),4,(255,0,0),-1)
-                cv2.rectangle(frame,(x1,y1),(x2,y2),(0,255,0),2)
-                cvzone.putTextRect(frame,f'{track_id}',(x1,y1),1,1)
-                if (prev_cy>line_y>cy):
-                    out_count+=1
-                    out_ids.append(track_id)
-                    cv2.circle(frame, (cx, cy), 4, (255, 0, 0), -1)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cvzone.putTextRect(frame, f'{track_id}', (x1, y1), 1, 1)
-            track_history[track_id] = (cx,cy)
-
-    # Display counts using cvzone's putTextRect
-    cvzone.putTextRect(frame, f'IN: {in_count}', (40,60), scale=2, thickness=2, colorT=(255, 255, 255), colorR=(0, 128, 0))
-    cvzone.putTextRect(frame, f'OUT: {out_count}', (40,100), scale=2, thickness=2, colorT=(255, 255, 255), colorR=(0, 0, 255))
-    cv2.line(frame, (line_x,0),(line_x,frame.shape[0]),(255,255,255),2)
-    cv2.line(frame, (0, line_y), (frame.shape[1], line_y), (255,255,255),2)
-
-    # Show the frame
-    cv2.imshow("RGB", frame)
-    # print(track_history)
-    # Press ESC to exit
-    if cv2.waitKey(1) & 0xFF == 27:
+    if item is None:
+        break
+    frame_count, frame = item
+
+    detected = frame_count % DETECT_EVERY == 0
+    if detected:
+        # Detect and track persons (class 0)
+        results = model.track(frame, persist=True, classes=[0], verbose=False, imgsz=640,
+                              half=USE_TRT, device=0 if USE_TRT else 'cpu')
+        # annotated_frame = results[0].plot()
+
+        b = results[0].boxes
+        if b.id is not None:
+            # Pack id | cls | xyxy on the device so the frame needs a single device->host copy (one sync)
+            data = torch.cat((b.id[:, None], b.cls[:, None], b.xyxy), dim=1).cpu().numpy()
+            ids = data[:, 0].astype(int)
+            class_ids = data[:, 1].astype(int)
+            boxes = data[:, 2:6].astype(int)
+            # print("Detected: ", len(ids), " | ", ids)
+        else:
+            ids = np.empty(0, dtype=int)
+            boxes = np.empty((0, 4), dtype=int)
+        cx = (boxes[:, 0] + boxes[:, 2]) // 2
+        cy = boxes[:, 1] #(y1+y2)//2 #y2-2
+
+        if len(ids) and ids.max() >= len(prev_cy):
+            size = 2 * (ids.max() + 1)
+            prev_cy, det_cx, det_cy = (grow_to(a, size, -1) for a in (prev_cy, det_cx, det_cy))
+            det_frame, vel = grow_to(det_frame, size, 0), grow_to(vel, size, 0)
+
+        # Velocity since the previous detection of the same track (0 for new tracks)
+        redetected = det_cy[ids] != -1
+        elapsed = np.maximum(frame_count - det_frame[ids], 1)[:, None]
+        moved = np.stack((cx - det_cx[ids], cy - det_cy[ids]), axis=1)
+        vel[ids] = np.where(redetected[:, None], moved / elapsed, 0)
+        det_cx[ids], det_cy[ids], det_frame[ids] = cx, cy, frame_count
+        active_ids, active_boxes = ids, boxes
+    else:
+        # Propagate the last detections instead of running the model (for drawing only, never counted)
+        ids = active_ids
+        shift = np.rint(vel[ids] * (frame_count - det_frame[ids])[:, None]).astype(int)
+        boxes = active_boxes + np.tile(shift, 2)
+        cx = det_cx[ids] + shift[:, 0]
+        cy = det_cy[ids] + shift[:, 1]
+
+    for k in np.flatnonzero(ids == 7):
+        print(f"{cx[k]},{cy[k]}")
+
+    pcy = prev_cy[ids]
+    seen = pcy != -1
+    if detected:
+        # Crossing test for all tracks at once, between consecutive detections only:
+        # extrapolated positions could overshoot the line and count crossings that never happened
+        in_mask = seen & (pcy < LINE_Y) & (cy >= LINE_Y)
+        out_mask = seen & (pcy > LINE_Y) & (cy <= LINE_Y)
+
+        in_count += int(in_mask.sum())
+        out_count += int(out_mask.sum())
+        crossed_in = ids[in_mask]
+        in_ids, n_in = append_rows(in_ids, n_in, np.stack((crossed_in, np.full_like(crossed_in, frame_count)), axis=1))
+        out_ids, n_out = append_rows(out_ids, n_out, ids[out_mask])
+        prev_cy[ids] = cy
+    else:
+        in_mask = out_mask = np.zeros(len(ids), dtype=bool)
+
+    tracks = []  # (track_id, box, cx, cy, event) to draw on the writer thread
+    for k in np.flatnonzero(seen):
+        event = 'in' if in_mask[k] else 'out' if out_mask[k] else None
+        tracks.append((int(ids[k]), tuple(boxes[k].tolist()), int(cx[k]), int(cy[k]), event))
+
+    put_or_stop(draw_q, (frame, tracks, in_count, out_count))
+
+# Shut the pipeline down: unblock the reader, let the writer drain and exit
+# (timed puts: after ESC the writer no longer reads draw_q, so a full queue must not block shutdown)
+stop_event.set()
+while writer_thread.is_alive():
+    try:
+        draw_q.put(None, timeout=0.1)
         break
+    except queue.Full:
+        pass
+writer_thread.join()
+reader_thread.join()
 cap.release()
-cv2.destroyAllWindows()
-import numpy as np
-print(f"IN IDs: {np.array(in_ids).tolist()}")
-print(f"OUT IDs: {np.array(out_ids).tolist()}")
\ No newline at end of file
+print(f"IN IDs: {in_ids[:n_in].tolist()}")
+print(f"OUT IDs: {out_ids[:n_out].tolist()}")
@@ -2,6 +2,7 @@
 from curses.textpad import rectangle
 
 import cv2
+import numpy as np
 from torch.backends.mkl import verbose
 from ultralytics import YOLO
 import cvzone
@@ -13,8 +14,33 @@ names=model.names
 line_x = 500
 line_y = 200
 
-# Track previous center positions
-track_history = {}
+# Track previous center positions: flat arrays indexed by track_id (-1 = no history),
+# grown when a larger id shows up; entries of tracks unseen for STALE_FRAMES are cleared every DECAY_EVERY frames
+MAX_TID = 1 << 16
+hist_cx = np.full(MAX_TID, -1, dtype=np.int32)
+hist_cy = np.full(MAX_TID, -1, dtype=np.int32)
+last_seen = np.zeros(MAX_TID, dtype=np.int32)  # frame of the last update per track_id
+DECAY_EVERY = 1000
+STALE_FRAMES = 1000
+
+
+def grow_to(arr, size, fill):
+    """Returns arr padded with `fill` to at least `size` entries."""
+    if len(arr) >= size:
+        return arr
+    return np.concatenate((arr, np.full(size - len(arr), fill, dtype=arr.dtype)))
+
+
+try:
+    # Compiled crossing test, build with: cythonize -i counter_kernel.pyx
+    from counter_kernel import update_counts
+except ImportError:
+    def update_counts(ids, cy, hist_cy, line_y):
+        """numpy fallback of counter_kernel.update_counts: (prev_cy, crossed) per track, stores cy as history."""
+        prev_cy = hist_cy[ids]
+        crossed = (prev_cy != -1) & (prev_cy < line_y) & (line_y < cy)
+        hist_cy[ids] = cy
+        return prev_cy, crossed
 
 # IN/OUT counters
 in_count = 0
@@ -51,15 +77,22 @@ while True:
     # annotated_frame = results[0].plot()
 
     if results[0].boxes.id is not None:
-        ids = results[0].boxes.id.cpu().numpy().astype(int)
-        boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
-        class_ids = results[0].boxes.cls.int().cpu().tolist()
+        ids = results[0].boxes.id.cpu().numpy().astype(np.int32)
+        boxes = results[0].boxes.xyxy.cpu().numpy().astype(np.int32)
         # print("Detected: ", len(ids), " | ", ids)
-        for track_id, box, class_id in zip(ids,boxes,class_ids):
-            x1,y1,x2,y2=box
-            name=names[class_id]
-            cx=int((x1+x2)/2)
-            cy= y1 + 4 # (y1+y2)//2 #y2-2
+        # Columnar (struct-of-arrays) coordinates, computed for all tracks at once
+        X1, Y1, X2, Y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+        CX = (X1 + X2) // 2
+        CY = Y1 + 4 # (Y1+Y2)//2 #Y2-2
+        if ids.max() >= len(hist_cy):
+            size = 2 * (int(ids.max()) + 1)
+            hist_cx, hist_cy, last_seen = grow_to(hist_cx, size, -1), grow_to(hist_cy, size, -1), grow_to(last_seen, size, 0)
+        # Crossing test + history update for all tracks in one call
+        PREV_CY, CROSSED = update_counts(ids, CY, hist_cy, line_y)
+        # tolist() turns each column into Python ints in one C call; only drawing/bookkeeping stays per track
+        for track_id, x1, y1, x2, y2, cx, cy, prev_cy, crossed in zip(ids.tolist(), X1.tolist(), Y1.tolist(), X2.tolist(),
+                                                                      Y2.tolist(), CX.tolist(), CY.tolist(),
+                                                                      PREV_CY.tolist(), CROSSED.tolist()):
             rectangle_rgb = (255,0,0)
             if track_id == 12 or 1==1:
                 rectangle_rgb = (0,0,255)
@@ -68,11 +101,10 @@ while True:
                 cv2.rectangle(frame,(x1,y1),(x2,y2),rectangle_rgb,2)
                 cvzone.putTextRect(frame,f'{track_id}',(x1,y1),1,1)
 
-            if track_id in track_history:
-                prev_cx, prev_cy = track_history[track_id]
+            if prev_cy != -1:
                 if track_id == 12:
                     print(f"Tracking {frame_count} ===>>> {track_id} | line_y: {line_y} | cy: {cy} | prev_cy: {prev_cy} ")
-                if (prev_cy < line_y < cy):
+                if crossed:
                     in_count += 1
                     in_ids.append((track_id, frame_count))
                     cv2.circle(frame,(cx,cy),4,(255,0,0),-1)
@@ -84,7 +116,12 @@ while True:
                 #     cv2.circle(frame, (cx, cy), 4, (255, 0, 0), -1)
                 #     cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
                 #     cvzone.putTextRect(frame, f'{track_id}', (x1, y1), 1, 1)
-            track_history[track_id] = (cx,cy)
+        hist_cx[ids], last_seen[ids] = CX, frame_count
+
+    # Forget tracks that have not been seen for a while so their slots read as new again
+    if frame_count % DECAY_EVERY == 0:
+        stale = (hist_cy != -1) & (frame_count - last_seen > STALE_FRAMES)
+        hist_cx[stale] = hist_cy[stale] = -1
 
     # Display counts using cvzone's putTextRect
     cvzone.putTextRect(frame, f'IN: {in_count}', (40,60), scale=2, thickness=2, colorT=(255, 255, 255), colorR=(0, 128, 0))
@@ -94,12 +131,11 @@ while True:
 
     # Show the frame
     cv2.imshow("RGB", frame)
-    # print(track_history)
+    # print(np.flatnonzero(hist_cy != -1))
     # Press ESC to exit
     if cv2.waitKey(1) & 0xFF == 27:
         break
 cap.release()
 cv2.destroyAllWindows()
-import numpy as np
 print(f"IN IDs: {np.array(in_ids).tolist()}")
 print(f"OUT IDs: {np.array(out_ids).tolist()}")
\ No newline at end of file
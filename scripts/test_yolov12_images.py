@@ -1,14 +1,23 @@
 from ultralytics import YOLO
 import os
+import sys
+import torch
 
 # Define the path to your test images
 IMAGE_DIR=os.path.join('..', 'data', 'images')
+# Accepted image file extensions (lowercase)
+IMAGE_EXTS=frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp'})
 OUTPUT_DIR=os.path.join('..', 'runs', 'detect')  # Ultralytics typically creates subfolders here
 
 # Path to the YOLOv12 model weights
 # 'yolov12.pt' for detection, 'yolov12-seg.pt' for segmentation, etc.
 MODEL_NAME='yolo12n.pt'
 
+# Images per forward pass; results are streamed so only one batch is held in memory
+BATCH_SIZE=16
+IMAGE_SIZE=640
+DEVICE='cuda:0' if torch.cuda.is_available() else 'cpu'
+
 
 def test_yolov12_image_detection():
     print(f"Loading YOLOv12 model: {MODEL_NAME}")
@@ -22,8 +31,12 @@ def test_yolov12_image_detection():
         return
 
     # Get a list of all image files in the directory
-    image_files=[os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR)
-                 if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
+    with os.scandir(IMAGE_DIR) as entries:
+        image_entries=[entry for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTS]
+    # Paths and file names split once up front, indexed like the results
+    image_files=[entry.path for entry in image_entries]
+    image_names=[entry.name for entry in image_entries]
 
     if not image_files:
         print(f"No image files found in {IMAGE_DIR}. Please add some images to test.")
@@ -33,52 +46,70 @@ def test_yolov12_image_detection():
     print("Running inference...")
 
     try:
-        # Run inference on the images
-        # The 'save=True' argument will save the annotated images to the 'runs/detect/predict' directory
-        results=model.predict(source=image_files, save=True, project=OUTPUT_DIR, name='yolov12_image_test')
-
-        print("\nInference complete!")
-        output_path=os.path.join(OUTPUT_DIR, 'yolov12_image_test')
-        print(f"Annotated images saved to: {output_path}")
+        # Let cuDNN pick the fastest kernels for the fixed input size
+        torch.backends.cudnn.benchmark=True
 
         # Process and capture detection details
         all_detections=[]  # To store all detections across images
 
-        for i, result in enumerate(results):
-            image_filename=os.path.basename(image_files[i])
-            print(f"\n--- Detections for: {image_filename} ---")
-
-            # This list will store detections for the current image
-            image_detections=[]
-
-            if result.boxes:  # If object detection results are available
-                # Iterate through each detected bounding box
-                for box in result.boxes:
-                    class_id=int(box.cls[0])  # Get the class ID (e.g., 0 for 'person', 1 for 'bicycle')
-                    label=model.names[class_id]  # Map class ID to a human-readable label (e.g., 'person')
-                    confidence=float(box.conf[0])  # Get the confidence score
-
-                    detection_info={
-                        "class_name": label,
-                        "confidence": confidence,
-                        "bbox_xyxy": box.xyxy[0].tolist(),  # Bounding box in [x1, y1, x2, y2] format
-                        "image_path": image_files[i]  # Useful for tracing back
-                    }
-                    image_detections.append(detection_info)
-                    all_detections.append(detection_info)
-
-                    print(f"  - {label} (Confidence: {confidence:.2f}) [BBox: {box.xyxy[0].tolist()}]")
-            else:
-                print("  No objects detected.")
+        # Run inference batch by batch
+        # The 'save=True' argument will save the annotated images to the 'runs/detect/predict' directory
+        for start in range(0, len(image_files), BATCH_SIZE):
+            batch_files=image_files[start:start+BATCH_SIZE]
+            results=model.predict(source=batch_files,
+                                  batch=len(batch_files),
+                                  stream=True,  # Yield results lazily instead of materializing the whole batch
+                                  imgsz=IMAGE_SIZE,
+                                  device=DEVICE,
+                                  half=DEVICE!='cpu',
+                                  save=True,
+                                  project=OUTPUT_DIR,
+                                  name='yolov12_image_test',
+                                  exist_ok=True)  # Keep every batch in the same output folder
+
+            for i, result in enumerate(results, start=start):
+                image_filename=image_names[i]
+                # Output for this image is collected and written with a single call
+                lines=[f"\n--- Detections for: {image_filename} ---"]
+
+                # This list will store detections for the current image
+                image_detections=[]
+
+                if result.boxes:  # If object detection results are available
+                    # Iterate through each detected bounding box
+                    for box in result.boxes:
+                        class_id=int(box.cls[0])  # Get the class ID (e.g., 0 for 'person', 1 for 'bicycle')
+                        label=model.names[class_id]  # Map class ID to a human-readable label (e.g., 'person')
+                        confidence=float(box.conf[0])  # Get the confidence score
+                        bbox=box.xyxy[0].tolist()  # Bounding box in [x1, y1, x2, y2] format
+
+                        detection_info={
+                            "class_name": label,
+                            "confidence": confidence,
+                            "bbox_xyxy": bbox,
+                            "image_path": image_files[i],  # Useful for tracing back
+                            "image_name": image_filename
+                        }
+                        image_detections.append(detection_info)
+                        all_detections.append(detection_info)
+
+                        lines.append(f"  - {label} (Confidence: {confidence:.2f}) [BBox: {bbox}]")
+                else:
+                    lines.append("  No objects detected.")
+                sys.stdout.write("\n".join(lines)+"\n")
+
+                # You can also store image_detections if you want results per image separately
+                # For this example, we're just printing and aggregating to all_detections
 
-            # You can also store image_detections if you want results per image separately
-            # For this example, we're just printing and aggregating to all_detections
+        print("\nInference complete!")
+        output_path=os.path.join(OUTPUT_DIR, 'yolov12_image_test')
+        print(f"Annotated images saved to: {output_path}")
 
         print("\n--- Summary of All Detections Across All Images ---")
         if all_detections:
-            for detection in all_detections:
-                print(
-                    f"Image: {os.path.basename(detection['image_path'])}, Object: {detection['class_name']} (Conf: {detection['confidence']:.2f})")
+            sys.stdout.write("".join(
+                f"Image: {detection['image_name']}, Object: {detection['class_name']} (Conf: {detection['confidence']:.2f})\n"
+                for detection in all_detections))
         else:
             print("No objects were detected in any of the images.")
 
@@ -1,10 +1,17 @@
 from ultralytics import YOLO
 import os
-from PIL import Image  # Pillow library for image manipulation
+import sys
+import cv2
+import numpy as np
+import torch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Configuration ---
 # Path to the directory containing your input test images
 IMAGE_DIR=os.path.join('..', 'data', 'images')
+# Accepted image file extensions (lowercase)
+IMAGE_EXTS=frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp'})
 # Path to the directory where cropped 'person' images will be saved
 CROPPED_OUTPUT_DIR=os.path.join('..', 'data', 'cropped_persons')
 # Path to the directory where Ultralytics will save annotated (boxes drawn on) images
@@ -18,6 +25,19 @@ MODEL_NAME='yolo12n.pt'
 # Detections below this threshold will be ignored.
 CONFIDENCE_THRESHOLD=0.5
 
+# COCO class id of 'person'
+PERSON_CLASS_ID=0
+
+# Images per forward pass; results are streamed so only one batch is held in memory
+BATCH_SIZE=16
+IMAGE_SIZE=640
+DEVICE='cuda:0' if torch.cuda.is_available() else 'cpu'
+
+# JPEG quality for the saved crops (Pillow's default was 75; 90 keeps crops close to the source)
+JPEG_PARAMS=[cv2.IMWRITE_JPEG_QUALITY, 90]
+# Threads encoding/writing crops (cv2.imwrite releases the GIL, so writes overlap with inference)
+SAVE_WORKERS=8
+
 
 def extract_and_store_persons():
     """
@@ -49,8 +69,13 @@ def extract_and_store_persons():
         return
 
     # --- Gather Image Files ---
-    image_files=[os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR)
-                 if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
+    with os.scandir(IMAGE_DIR) as entries:
+        image_entries=[entry for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTS]
+    # Paths and file names split once up front, indexed like the results
+    image_files=[entry.path for entry in image_entries]
+    image_names=[entry.name for entry in image_entries]
+    image_stems=[os.path.splitext(name)[0] for name in image_names]
 
     if not image_files:
         print(f"No image files found in '{IMAGE_DIR}'. Please add some images to test.")
@@ -61,86 +86,110 @@ def extract_and_store_persons():
 
     total_persons_extracted=0
 
-    try:
-        # --- Run Inference ---
-        # 'save=True' will save the annotated images to a subfolder within INFERENCE_OUTPUT_DIR
-        # 'project' and 'name' control the output folder structure for annotated images
-        results=model.predict(source=image_files,
-                              save=True,
-                              project=INFERENCE_OUTPUT_DIR,
-                              name='yolov12_image_person_extraction',
-                              # This creates 'runs/detect/yolov12_image_person_extraction'
-                              conf=CONFIDENCE_THRESHOLD,  # Apply confidence threshold
-                              verbose=False)  # Set to True for more detailed console output during inference
-
-        # --- Process Each Image's Results ---
-        for i, result in enumerate(results):
-            image_path=image_files[i]
-            image_filename=os.path.basename(image_path)
-            print(f"\n--- Processing detections for: {image_filename} ---")
-
-            # Load the original image using PIL for cropping.
-            # We explicitly open the original image here, not the annotated one.
-            try:
-                original_image=Image.open(image_path).convert("RGB")
-            except Exception as img_e:
-                print(f"  Error loading original image '{image_filename}': {img_e}. Skipping.")
-                continue
+    # One cv2.imwrite task per crop, fed by the result stream
+    pool=ThreadPoolExecutor(max_workers=SAVE_WORKERS)
+    pending=deque()  # (image_filename, [(cropped_filename, cropped_filepath, future), ...]) in input order
 
-            person_count_in_image=0
+    def report_crops(image_filename, saves):
+        """Waits for an image's crop writes (in order), logs and counts them."""
+        nonlocal total_persons_extracted
+        lines=[f"\n--- Crops for: {image_filename} ---"] if saves else []
+        person_count_in_image=0
+        for cropped_filename, cropped_filepath, future in saves:
+            try:
+                if not future.result():
+                    raise IOError("cv2.imwrite failed")
+                lines.append(f"    -> Saved cropped person to: {cropped_filepath}")
+                person_count_in_image+=1
+            except Exception as save_e:
+                lines.append(f"    Error saving cropped image '{cropped_filename}': {save_e}")
+        total_persons_extracted+=person_count_in_image
+
+        if person_count_in_image==0:
+            lines.append(f"  No 'person' objects (above confidence {CONFIDENCE_THRESHOLD}) detected in {image_filename}.")
+        sys.stdout.write("\n".join(lines)+"\n")
 
-            if result.boxes:  # Check if any objects were detected in this image
-                for j, box in enumerate(result.boxes):
-                    class_id=int(box.cls[0])  # Get the class ID (e.g., 0 for 'person')
-                    label=model.names[class_id]  # Map class ID to human-readable label (e.g., 'person')
-                    confidence=float(box.conf[0])  # Get the confidence score
+    try:
+        # Let cuDNN pick the fastest kernels for the fixed input size
+        torch.backends.cudnn.benchmark=True
+
+        # --- Run Inference, batch by batch ---
+        for start in range(0, len(image_files), BATCH_SIZE):
+            batch_files=image_files[start:start+BATCH_SIZE]
+            # 'save=True' will save the annotated images to a subfolder within INFERENCE_OUTPUT_DIR
+            # 'project' and 'name' control the output folder structure for annotated images
+            results=model.predict(source=batch_files,
+                                  batch=len(batch_files),
+                                  stream=True,  # Yield results lazily instead of materializing the whole batch
+                                  imgsz=IMAGE_SIZE,
+                                  device=DEVICE,
+                                  half=DEVICE!='cpu',
+                                  save=True,
+                                  project=INFERENCE_OUTPUT_DIR,
+                                  name='yolov12_image_person_extraction',
+                                  # This creates 'runs/detect/yolov12_image_person_extraction'
+                                  exist_ok=True,  # Keep every batch in the same output folder
+                                  conf=CONFIDENCE_THRESHOLD,  # Apply confidence threshold
+                                  verbose=False)  # Set to True for more detailed console output during inference
+
+            # --- Process Each Image's Results ---
+            for i, result in enumerate(results, start=start):
+                image_filename=image_names[i]
+                # Output for this image is collected and written with a single call
+                lines=[f"\n--- Processing detections for: {image_filename} ---"]
+
+                saves=[]
+
+                if result.boxes:  # Check if any objects were detected in this image
+                    # One device->host copy per attribute for all boxes of the image
+                    class_ids=result.boxes.cls.cpu().numpy().astype(int)
+                    confidences=result.boxes.conf.cpu().numpy()
+                    boxes_xyxy=result.boxes.xyxy.cpu().numpy()
 
                     # Print detected object details (even if not 'person' or below threshold)
-                    print(f"  - Detected: {label} (Confidence: {confidence:.2f}) [BBox: {box.xyxy[0].tolist()}]")
-
-                    # --- Extract and Save 'person' Crops ---
-                    if label=='person':
-                        x1, y1, x2, y2=map(int, box.xyxy[0].tolist())  # Convert bbox to integer coordinates
-
-                        # Ensure coordinates are within image bounds (important for robustness)
-                        x1=max(0, x1)
-                        y1=max(0, y1)
-                        x2=min(original_image.width, x2)
-                        y2=min(original_image.height, y2)
-
-                        # Validate bounding box dimensions before cropping
-                        if x2<=x1 or y2<=y1:
-                            print(
-                                f"    Warning: Invalid bounding box ({x1},{y1},{x2},{y2}) for person {j} in {image_filename}, skipping crop.")
-                            continue
-
-                        # Perform the image crop
-                        cropped_person_image=original_image.crop((x1, y1, x2, y2))
+                    for class_id, confidence, bbox in zip(class_ids, confidences, boxes_xyxy):
+                        lines.append(f"  - Detected: {model.names[class_id]} (Confidence: {confidence:.2f}) [BBox: {bbox.tolist()}]")
+
+                    # --- Select, clip and validate 'person' boxes all at once ---
+                    image_height, image_width=result.orig_img.shape[:2]
+                    xyxy=boxes_xyxy.astype(np.int32)  # Convert bboxes to integer coordinates
+                    # Ensure coordinates are within image bounds (important for robustness)
+                    np.clip(xyxy, 0, [image_width, image_height, image_width, image_height], out=xyxy)
+                    is_person=(class_ids==PERSON_CLASS_ID)&(confidences>=CONFIDENCE_THRESHOLD)
+                    valid=(xyxy[:, 2]>xyxy[:, 0])&(xyxy[:, 3]>xyxy[:, 1])
+
+                    for j in np.flatnonzero(is_person&~valid):
+                        x1, y1, x2, y2=xyxy[j].tolist()
+                        lines.append(f"    Warning: Invalid bounding box ({x1},{y1},{x2},{y2}) for person {j} in {image_filename}, skipping crop.")
+
+                    base_name=image_stems[i]
+                    for j in np.flatnonzero(is_person&valid):
+                        x1, y1, x2, y2=xyxy[j].tolist()
+                        # Perform the image crop (a view into the original image, no copy)
+                        cropped_person_image=result.orig_img[y1:y2, x1:x2]
 
                         # Create a unique filename for the cropped person
                         # Format: originalfilename_person_idx_conf_score.jpg
-                        base_name=os.path.splitext(image_filename)[0]
-                        cropped_filename=f"{base_name}_person_{j}_conf{confidence:.2f}.jpg"
+                        cropped_filename=f"{base_name}_person_{j}_conf{confidences[j]:.2f}.jpg"
                         cropped_filepath=os.path.join(CROPPED_OUTPUT_DIR, cropped_filename)
+                        saves.append((cropped_filename, cropped_filepath, pool.submit(cv2.imwrite, cropped_filepath, cropped_person_image, JPEG_PARAMS)))
+                else:
+                    lines.append("  No objects detected in this image.")
+                sys.stdout.write("\n".join(lines)+"\n")
 
-                        try:
-                            cropped_person_image.save(cropped_filepath)
-                            print(f"    -> Saved cropped person to: {cropped_filepath}")
-                            person_count_in_image+=1
-                            total_persons_extracted+=1
-                        except Exception as save_e:
-                            print(f"    Error saving cropped image '{cropped_filename}': {save_e}")
-            else:
-                print("  No objects detected in this image.")
+                pending.append((image_filename, saves))
 
-            if person_count_in_image==0:
-                print(f"  No 'person' objects (above confidence {CONFIDENCE_THRESHOLD}) detected in {image_filename}.")
+                # --- Report images whose crops are all written, keeping input order ---
+                while pending and all(future.done() for _, _, future in pending[0][1]):
+                    report_crops(*pending.popleft())
 
     except Exception as e:
         print(f"\nAn unexpected error occurred during inference or extraction: {e}")
-        # Hint for common error if Pillow is missing
-        if "No module named 'PIL'" in str(e):
-            print("Hint: The 'Pillow' library is required for image manipulation. Install it with: pip install Pillow")
+    finally:
+        # Wait for the remaining writes (also after an error, so every written crop is reported and counted)
+        pool.shutdown(wait=True)
+        while pending:
+            report_crops(*pending.popleft())
 
     print(f"\n--- Extraction Process Complete ---")
     print(f"Total 'person' images extracted: {total_persons_extracted}")
@@ -1,38 +1,98 @@
 # yolov12_testing_project/scripts/test_yolov12_img_cropping.py
 
 from ultralytics import YOLO
+import argparse
 import os
-from PIL import Image  # Still needed here to open the original image
+import cv2
+import numpy as np
+import torch
 import datetime  # Still needed here to generate the timestamp for a new entry
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Import utility functions ---
-from src.utils.image_processing import pad_to_square_and_resize
-from src.utils.metadata_manager import save_metadata
+from src.utils.image_processing import HAS_NUMBA, crop_pad_resize_batch, pad_to_square_and_resize
+from src.utils.metadata_manager import append_jsonl, load_jsonl, save_metadata
 
 # --- Configuration ---
 IMAGE_DIR=os.path.join('..', 'data', 'images', 'phase1')
+IMAGE_EXTS=frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp'})
 CROPPED_OUTPUT_DIR=os.path.join('..', 'data', 'cropped_persons')
 INFERENCE_OUTPUT_DIR=os.path.join('..', 'runs', 'detect')
 
-MODEL_NAME='yolo12n.pt'
+# TensorRT FP16 engine built by export_engine.py if present, PyTorch weights otherwise
+MODEL_NAME='yolo12n.engine' if os.path.exists('yolo12n.engine') else 'yolo12n.pt'
 CONFIDENCE_THRESHOLD=0.5
 
+# Images per forward pass (the engine is exported with dynamic=True, batch=16); results are streamed
+BATCH_SIZE=16
+IMAGE_SIZE=640
+
 # New Parameters for Cropping Best Practices
 CROP_PADDING_RATIO=0.10
 TARGET_CLASSIFIER_SIZE=224
 MIN_CROP_DIMENSION_PX=50
 
 # Metadata Configuration
-METADATA_FILENAME='cropped_persons_metadata.json'
+# Rewritten on every run: entries are appended as JSON Lines while crops are saved;
+# --export-json also writes the full JSON list
+METADATA_FILENAME='cropped_persons_metadata.jsonl'
+METADATA_EXPORT_FILENAME='cropped_persons_metadata.json'
+# Write buffer of the JSON Lines file: records are collected per image and flushed once the image is reported,
+# so an interrupted run only loses records of images still in flight
+METADATA_BUFFER_SIZE=1<<20
+
+# JPEG settings of the saved crops (OpenCV's libjpeg-turbo encoder; no extra Huffman optimization pass)
+JPEG_PARAMS=[cv2.IMWRITE_JPEG_QUALITY, 85, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+
+# Threads padding/resizing/encoding crops (OpenCV releases the GIL, so this overlaps with inference)
+CROP_WORKERS=os.cpu_count()
+
+# With numba installed, all person crops of an image are padded/resized by one parallel JIT kernel
+# (nearest-neighbour sampling). Set to False for the slower, smoother OpenCV area/Lanczos resize.
+FAST_CROPS=True
+
 
+def save_crop(final_cropped_image, cropped_filepath):
+    """
+    Saves a final (square, resized) crop as JPEG. Runs on a worker thread; raises on failure.
 
-def extract_and_store_persons_for_classification():
+    Args:
+        final_cropped_image (np.ndarray): The processed person crop (BGR).
+        cropped_filepath (str): Output path of the final crop.
+    """
+    # Encode in memory, then write the whole JPEG with a single call
+    ok, jpeg_buffer=cv2.imencode('.jpg', final_cropped_image, JPEG_PARAMS)
+    if not ok:
+        raise IOError("cv2.imencode failed")
+    with open(cropped_filepath, 'wb') as f:
+        f.write(jpeg_buffer)
+
+
+def process_and_save_crop(padded_crop, cropped_filepath):
+    """
+    Pads a crop to a square, resizes it to TARGET_CLASSIFIER_SIZE and saves it as JPEG.
+    Runs on a worker thread; raises on failure.
+
+    Args:
+        padded_crop (np.ndarray): The padded person crop (BGR).
+        cropped_filepath (str): Output path of the final crop.
+    """
+    # Pad to Square Aspect Ratio and Resize (using utility function)
+    save_crop(pad_to_square_and_resize(padded_crop, TARGET_CLASSIFIER_SIZE), cropped_filepath)
+
+
+def extract_and_store_persons_for_classification(export_json=False, annotate=False):
     """
     Loads a YOLOv12 model, runs inference on images in IMAGE_DIR,
     detects 'person' objects, applies padding, filters by size,
     pads to a square aspect ratio, resizes to a target dimension,
     and saves these processed cropped images to CROPPED_OUTPUT_DIR.
-    It also generates a metadata JSON file tracking the process and results.
+    It also appends one metadata record per crop to a JSON Lines file tracking the process and results.
+
+    Args:
+        export_json (bool): Also export the JSON Lines metadata as a single JSON list at the end.
+        annotate (bool): Also save annotated input images to INFERENCE_OUTPUT_DIR (slower; off by default).
     """
     print("--- Starting Enhanced Person Extraction Process ---")
     print(f"Model: {MODEL_NAME}, Confidence Threshold: {CONFIDENCE_THRESHOLD}")
@@ -40,12 +100,17 @@ def extract_and_store_persons_for_classification():
         f"Crop Padding Ratio: {CROP_PADDING_RATIO}, "
         f"Target Classifier Size: {TARGET_CLASSIFIER_SIZE}x{TARGET_CLASSIFIER_SIZE}px")
     print(f"Minimum Crop Dimension: {MIN_CROP_DIMENSION_PX}px")
+    fused_crops_enabled=FAST_CROPS and HAS_NUMBA
+    print(f"Crop resizing: {'numba batch kernel (nearest)' if fused_crops_enabled else 'OpenCV (area/Lanczos)'}")
 
     # --- Ensure output directories exist ---
     try:
         os.makedirs(CROPPED_OUTPUT_DIR, exist_ok=True)
-        os.makedirs(INFERENCE_OUTPUT_DIR, exist_ok=True)
-        print(f"Ensured '{CROPPED_OUTPUT_DIR}' and '{INFERENCE_OUTPUT_DIR}' exist.")
+        if annotate:
+            os.makedirs(INFERENCE_OUTPUT_DIR, exist_ok=True)
+            print(f"Ensured '{CROPPED_OUTPUT_DIR}' and '{INFERENCE_OUTPUT_DIR}' exist.")
+        else:
+            print(f"Ensured '{CROPPED_OUTPUT_DIR}' exists.")
     except OSError as e:
         print(f"Error creating output directories: {e}. Exiting.")
         return
@@ -54,6 +119,12 @@ def extract_and_store_persons_for_classification():
     print(f"Attempting to load YOLOv12 model: {MODEL_NAME}")
     try:
         model=YOLO(MODEL_NAME)
+        if torch.cuda.is_available():
+            # Warm up once: FP16 weights on the GPU, predictor setup and cuDNN kernel selection
+            # happen here instead of inside the first real batch
+            torch.backends.cudnn.benchmark=True
+            model.predict(np.zeros((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8), imgsz=IMAGE_SIZE, half=True,
+                          verbose=False)
         print("Model loaded successfully.")
     except Exception as e:
         print(f"Error loading model '{MODEL_NAME}': {e}")
@@ -62,8 +133,9 @@ def extract_and_store_persons_for_classification():
         return
 
     # --- Gather Image Files ---
-    image_files=[os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR)
-                 if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
+    with os.scandir(IMAGE_DIR) as entries:
+        image_files=[entry.path for entry in entries
+                     if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTS]
 
     if not image_files:
         print(f"No image files found in '{IMAGE_DIR}'. Please add some images.")
@@ -72,15 +144,57 @@ def extract_and_store_persons_for_classification():
     print(f"Found {len(image_files)} images to process in '{IMAGE_DIR}'.")
 
     total_persons_extracted=0
-    all_crops_metadata=[]  # List to store metadata for all generated crops
+
+    # --- Start a fresh metadata file (a rerun overwrites the same crops); each saved crop appends one line ---
+    metadata_filepath=os.path.join(CROPPED_OUTPUT_DIR, METADATA_FILENAME)
+    try:
+        metadata_file=open(metadata_filepath, 'wb', buffering=METADATA_BUFFER_SIZE)
+    except OSError as e:
+        print(f"Error opening metadata file '{metadata_filepath}': {e}. Exiting.")
+        return
+
+    cropped_dir_abs=os.path.abspath(CROPPED_OUTPUT_DIR)  # abspath calls getcwd(); resolve once
+
+    pool=ThreadPoolExecutor(max_workers=CROP_WORKERS)
+    pending=deque()  # (image_filename, [(cropped_filepath, metadata_entry, future), ...]) in input order
+
+    def report_crops(image_filename, saves):
+        """Waits for an image's crop tasks (in order), logs them and appends their metadata."""
+        nonlocal total_persons_extracted
+        if saves:
+            print(f"\n--- Crops for: {image_filename} ---")
+        person_count_in_image=0
+        for cropped_filepath, metadata_entry, future in saves:
+            try:
+                future.result()
+                print(f"    -> Saved processed person crop to: {cropped_filepath}")
+                person_count_in_image+=1
+                total_persons_extracted+=1
+                append_jsonl(metadata_file, metadata_entry)
+            except Exception as save_e:
+                print(f"    Error saving processed image '{metadata_entry['final_crop_filename']}': {save_e}")
+        if person_count_in_image:
+            metadata_file.flush()  # One write for all records of the image
+
+        if person_count_in_image==0:
+            print(
+                f"  No 'person' objects (above confidence {CONFIDENCE_THRESHOLD} and min size {MIN_CROP_DIMENSION_PX}px) detected in {image_filename}.")
 
     try:
         # --- Run Inference ---
         results=model.predict(source=image_files,
-                              save=True,
+                              batch=BATCH_SIZE,  # Stack BATCH_SIZE images into one forward pass
+                              stream=True,  # Yield results lazily, only one batch is held in memory
+                              imgsz=IMAGE_SIZE,
+                              # Annotated images only with --annotate: plotting and writing them
+                              # costs about as much as yolo12n inference itself
+                              save=annotate,
+                              save_txt=False,
+                              save_conf=False,
                               project=INFERENCE_OUTPUT_DIR,
                               name='yolov12_person_extraction_for_classifier',
                               conf=CONFIDENCE_THRESHOLD,
+                              half=True,  # FP16 on GPU (ignored on CPU)
                               verbose=False)
 
         # --- Process Each Image's Results ---
@@ -89,126 +203,140 @@ def extract_and_store_persons_for_classification():
             image_filename=os.path.basename(image_path)
             print(f"\n--- Processing detections for: {image_filename} ---")
 
-            try:
-                original_image=Image.open(image_path).convert("RGB")
-            except Exception as img_e:
-                print(f"  Error loading original image '{image_filename}': {img_e}. Skipping image.")
-                continue
+            # Image as already decoded by YOLO (BGR numpy array), no second decode
+            original_image=result.orig_img
+            image_height, image_width=original_image.shape[:2]
+
+            saves=[]  # (cropped_filepath, metadata_entry, future) per person crop
 
-            person_count_in_image=0
+            # Per-image values shared by all of its crops
+            base_name=os.path.splitext(image_filename)[0]
+            original_image_abs_path=os.path.abspath(image_path)
+            cropping_timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
 
             if result.boxes:
-                for j, box in enumerate(result.boxes):
-                    class_id=int(box.cls[0])
-                    label=model.names[class_id]
-                    confidence=float(box.conf[0])
-                    x1_orig, y1_orig, x2_orig, y2_orig=box.xyxy[0].tolist()
+                # One device->host copy per attribute for all boxes of the image
+                boxes_xyxy=result.boxes.xyxy.cpu().numpy()
+                confidences=result.boxes.conf.cpu().numpy()
+                class_ids=result.boxes.cls.cpu().numpy().astype(int)
+
+                # --- Padded, clamped boxes and the size filter for all detections at once ---
+                xyxy=boxes_xyxy.astype(np.float64)  # Same arithmetic as on Python floats
+                pad_xy=(xyxy[:, 2:]-xyxy[:, :2])*(CROP_PADDING_RATIO/2)  # (pad_x, pad_y) per box
+                padded=np.concatenate((xyxy[:, :2]-pad_xy, xyxy[:, 2:]+pad_xy), axis=1).astype(int)  # int() truncation
+                np.clip(padded, 0, [image_width, image_height, image_width, image_height], out=padded)
+                crop_sizes=padded[:, 2:]-padded[:, :2]  # (width, height) per box
+                large_enough=(crop_sizes>=MIN_CROP_DIMENSION_PX).all(axis=1)
+                padded_boxes=padded.tolist()
+
+                # All kept person crops of the image, padded and resized in one kernel call
+                if fused_crops_enabled:
+                    is_person=np.array([model.names[c]=='person' for c in class_ids.tolist()], dtype=bool)
+                    keep=is_person&large_enough
+                    fused_crops=crop_pad_resize_batch(original_image, padded[keep], TARGET_CLASSIFIER_SIZE)
+                    fused_rows=np.cumsum(keep)-1  # Row of box j in fused_crops
+
+                for j in range(len(class_ids)):
+                    label=model.names[class_ids[j]]
+                    confidence=float(confidences[j])
+                    x1_orig, y1_orig, x2_orig, y2_orig=boxes_xyxy[j].tolist()
 
                     print(
                         f"  - Detected: {label} (Confidence: {confidence:.2f}) [BBox: [{x1_orig:.2f}, {y1_orig:.2f}, {x2_orig:.2f}, {y2_orig:.2f}]]")
 
                     # --- Extract and Save 'person' Crops ---
                     if label=='person':
-                        # 1. Apply Padding to Bounding Box
-                        bbox_width=x2_orig-x1_orig
-                        bbox_height=y2_orig-y1_orig
-
-                        pad_x=bbox_width*CROP_PADDING_RATIO/2
-                        pad_y=bbox_height*CROP_PADDING_RATIO/2
-
-                        x1_padded=max(0, int(x1_orig-pad_x))
-                        y1_padded=max(0, int(y1_orig-pad_y))
-                        x2_padded=min(original_image.width, int(x2_orig+pad_x))
-                        y2_padded=min(original_image.height, int(y2_orig+pad_y))
+                        # 1. Padded Bounding Box (computed above)
+                        x1_padded, y1_padded, x2_padded, y2_padded=padded_boxes[j]
 
                         # 2. Filter by Minimum Size
-                        current_crop_width=x2_padded-x1_padded
-                        current_crop_height=y2_padded-y1_padded
-
-                        if current_crop_width<MIN_CROP_DIMENSION_PX or current_crop_height<MIN_CROP_DIMENSION_PX:
+                        if not large_enough[j]:
                             print(
-                                f"    Skipping small person detection (dim: {current_crop_width}x{current_crop_height}px), below min {MIN_CROP_DIMENSION_PX}px.")
+                                f"    Skipping small person detection (dim: {x2_padded-x1_padded}x{y2_padded-y1_padded}px), below min {MIN_CROP_DIMENSION_PX}px.")
                             continue
 
-                        # 3. Perform Initial Crop with Padding
-                        try:
-                            padded_crop=original_image.crop((x1_padded, y1_padded, x2_padded, y2_padded))
-                        except Exception as crop_e:
-                            print(f"    Error during initial crop for person {j}: {crop_e}. Skipping.")
-                            continue
-
-                        # 4. Pad to Square Aspect Ratio and Resize (using utility function)
-                        final_cropped_image=pad_to_square_and_resize(padded_crop, TARGET_CLASSIFIER_SIZE)
-
-                        # 5. Save the Final Cropped Image
-                        base_name=os.path.splitext(image_filename)[0]
                         cropped_filename=f"{base_name}_person_{j}_conf{confidence:.2f}_{TARGET_CLASSIFIER_SIZE}px.jpg"
                         cropped_filepath=os.path.join(CROPPED_OUTPUT_DIR, cropped_filename)
 
-                        try:
-                            final_cropped_image.save(cropped_filepath)
-                            print(f"    -> Saved processed person crop to: {cropped_filepath}")
-                            person_count_in_image+=1
-                            total_persons_extracted+=1
-
-                            # 6. Store Metadata for this crop
-                            crop_id=f"{base_name}_person_{j}_conf{confidence:.4f}".replace('.', '_')
-
-                            metadata_entry={
-                                "crop_id": crop_id,
-                                "original_image_filename": image_filename,
-                                "original_image_path": os.path.abspath(image_path),
-                                "yolo_model_used": MODEL_NAME,
-                                "yolo_confidence_score": confidence,
-                                "original_bbox_xyxy": [round(val, 2) for val in [x1_orig, y1_orig, x2_orig, y2_orig]],
-                                "padded_bbox_xyxy": [x1_padded, y1_padded, x2_padded, y2_padded],
-                                "original_crop_dimensions_wh": [padded_crop.width, padded_crop.height],
-                                # Dimensions before square padding/resize
-                                "final_crop_filename": cropped_filename,
-                                "final_crop_path": os.path.abspath(cropped_filepath),
-                                "final_crop_resolution_wh": [TARGET_CLASSIFIER_SIZE, TARGET_CLASSIFIER_SIZE],
-                                "cropping_timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(
-                                    timespec='seconds'),
-                                "min_crop_dimension_filter_applied": MIN_CROP_DIMENSION_PX,
-                                "crop_padding_ratio_applied": CROP_PADDING_RATIO,
-                                "status": "raw_crop_generated",
-                                "assigned_label": None,
-                                "label_source": None,
-                                "labeling_timestamp": None,
-                                "dataset_split": None
-                            }
-                            all_crops_metadata.append(metadata_entry)
-
-                        except Exception as save_e:
-                            print(f"    Error saving processed image '{cropped_filename}': {save_e}")
+                        if fused_crops_enabled:
+                            # 3.-5. Already cropped, padded and resized by the batch kernel; save on a worker thread
+                            future=pool.submit(save_crop, fused_crops[fused_rows[j]], cropped_filepath)
+                        else:
+                            # 3. Perform Initial Crop with Padding
+                            padded_crop=original_image[y1_padded:y2_padded, x1_padded:x2_padded]
+                            # 4./5. Pad to square, resize and save on a worker thread
+                            future=pool.submit(process_and_save_crop, padded_crop, cropped_filepath)
+
+                        # 6. Metadata for this crop, appended once the save succeeded
+                        crop_id=f"{base_name}_person_{j}_conf{confidence:.4f}".replace('.', '_')
+
+                        metadata_entry={
+                            "crop_id": crop_id,
+                            "original_image_filename": image_filename,
+                            "original_image_path": original_image_abs_path,
+                            "yolo_model_used": MODEL_NAME,
+                            "yolo_confidence_score": confidence,
+                            "original_bbox_xyxy": [round(val, 2) for val in [x1_orig, y1_orig, x2_orig, y2_orig]],
+                            "padded_bbox_xyxy": [x1_padded, y1_padded, x2_padded, y2_padded],
+                            "original_crop_dimensions_wh": [x2_padded-x1_padded, y2_padded-y1_padded],
+                            # Dimensions before square padding/resize
+                            "final_crop_filename": cropped_filename,
+                            "final_crop_path": os.path.join(cropped_dir_abs, cropped_filename),
+                            "final_crop_resolution_wh": [TARGET_CLASSIFIER_SIZE, TARGET_CLASSIFIER_SIZE],
+                            "cropping_timestamp": cropping_timestamp,
+                            "min_crop_dimension_filter_applied": MIN_CROP_DIMENSION_PX,
+                            "crop_padding_ratio_applied": CROP_PADDING_RATIO,
+                            "status": "raw_crop_generated",
+                            "assigned_label": None,
+                            "label_source": None,
+                            "labeling_timestamp": None,
+                            "dataset_split": None
+                        }
+                        saves.append((cropped_filepath, metadata_entry, future))
             else:
                 print("  No objects detected in this image.")
 
-            if person_count_in_image==0:
-                print(
-                    f"  No 'person' objects (above confidence {CONFIDENCE_THRESHOLD} and min size {MIN_CROP_DIMENSION_PX}px) detected in {image_filename}.")
+            pending.append((image_filename, saves))
+
+            # Report images whose crops are all written, keeping input order
+            while pending and all(future.done() for _, _, future in pending[0][1]):
+                report_crops(*pending.popleft())
 
     except Exception as e:
         print(f"\nAn unexpected error occurred during inference or extraction: {e}")
-        if "No module named 'PIL'" in str(e):
-            print("Hint: The 'Pillow' library is required for image manipulation. Install it with: pip install Pillow")
         print(
             "Hint: Check your image files for corruption or unsupported formats if encountering image-related errors.")
+    finally:
+        # Wait for the remaining crops (also after an error, so every saved crop gets its metadata)
+        pool.shutdown(wait=True)
+        while pending:
+            report_crops(*pending.popleft())
+        metadata_file.close()
 
     print(f"\n--- Enhanced Extraction Process Complete ---")
     print(f"Total 'person' images extracted: {total_persons_extracted}")
     print(f"Processed cropped images can be found in: '{CROPPED_OUTPUT_DIR}'")
-    print(
-        f"Annotated input images saved in: '{os.path.join(INFERENCE_OUTPUT_DIR, 'yolov12_person_extraction_for_classifier')}'")
+    if annotate:
+        print(
+            f"Annotated input images saved in: '{os.path.join(INFERENCE_OUTPUT_DIR, 'yolov12_person_extraction_for_classifier')}'")
 
-    # --- Save Metadata to JSON File (using utility function) ---
-    metadata_filepath=os.path.join(CROPPED_OUTPUT_DIR, METADATA_FILENAME)
-    try:
-        save_metadata(all_crops_metadata, metadata_filepath)
-        print(f"Detailed metadata for all crops saved to: '{metadata_filepath}'")
-    except Exception as json_e:
-        print(f"Error saving metadata to JSON file '{metadata_filepath}': {json_e}")
+    print(f"Detailed metadata for all crops saved to: '{metadata_filepath}'")
+
+    # --- Optionally export the metadata as one JSON file (using utility functions) ---
+    if export_json:
+        export_filepath=os.path.join(CROPPED_OUTPUT_DIR, METADATA_EXPORT_FILENAME)
+        try:
+            save_metadata(load_jsonl(metadata_filepath), export_filepath)
+            print(f"Metadata exported as JSON to: '{export_filepath}'")
+        except Exception as json_e:
+            print(f"Error saving metadata to JSON file '{export_filepath}': {json_e}")
 
 
 if __name__=="__main__":
-    extract_and_store_persons_for_classification()
\ No newline at end of file
+    parser=argparse.ArgumentParser(description="Extract and store person crops for classification.")
+    parser.add_argument('--export-json', action='store_true',
+                        help=f"also export the metadata as a single JSON list ({METADATA_EXPORT_FILENAME})")
+    parser.add_argument('--annotate', action='store_true',
+                        help="also save annotated input images (slower)")
+    args=parser.parse_args()
+    extract_and_store_persons_for_classification(export_json=args.export_json, annotate=args.annotate)
\ No newline at end of file
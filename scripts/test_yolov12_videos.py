@@ -1,26 +1,32 @@
 # yolov12_testing_project/scripts/test_yolov12_videos.py
 
 from ultralytics import YOLO
+import argparse
 import os
 
 # --- Configuration ---
 # Path to the directory containing your input test videos
 VIDEO_DIR=os.path.join('..', 'data', 'videos')
+VIDEO_EXTS=frozenset({'.mp4', '.avi', '.mov', '.mkv', '.flv'})
 # Path to the directory where Ultralytics will save annotated video files
 INFERENCE_OUTPUT_DIR=os.path.join('..', 'runs', 'detect')
 
 # Name of the pre-trained YOLOv12 model to use
-MODEL_NAME='yolo12n.pt'
+# TensorRT FP16 engine built by export_engine.py if present, PyTorch weights otherwise
+MODEL_NAME='yolo12n.engine' if os.path.exists('yolo12n.engine') else 'yolo12n.pt'
 
 # Minimum confidence score for a detection to be considered valid
 CONFIDENCE_THRESHOLD=0.5
 
 
-def test_yolov12_video_detection():
+def test_yolov12_video_detection(annotate=False):
     """
     Loads a YOLOv12 model, runs inference on videos in VIDEO_DIR,
-    detects 'person' objects, and saves the annotated videos.
+    detects 'person' objects, and optionally saves the annotated videos.
     Prints a summary of person detections for each video.
+
+    Args:
+        annotate (bool): Also render and save annotated videos (slower; off by default).
     """
     print("--- Starting YOLOv12 Video Detection Test ---")
     print(f"Model: {MODEL_NAME}, Confidence Threshold: {CONFIDENCE_THRESHOLD}")
@@ -28,8 +34,9 @@ def test_yolov12_video_detection():
     # --- Ensure output directory exists ---
     # Ultralytics will create a subfolder like 'yolov12_video_detection' inside this.
     try:
-        os.makedirs(INFERENCE_OUTPUT_DIR, exist_ok=True)
-        print(f"Ensured '{INFERENCE_OUTPUT_DIR}' exists for annotated video output.")
+        if annotate:
+            os.makedirs(INFERENCE_OUTPUT_DIR, exist_ok=True)
+            print(f"Ensured '{INFERENCE_OUTPUT_DIR}' exists for annotated video output.")
     except OSError as e:
         print(f"Error creating output directory: {e}. Exiting.")
         return
@@ -46,8 +53,9 @@ def test_yolov12_video_detection():
         return
 
     # --- Gather Video Files ---
-    video_files=[os.path.join(VIDEO_DIR, f) for f in os.listdir(VIDEO_DIR)
-                 if f.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv'))]
+    with os.scandir(VIDEO_DIR) as entries:
+        video_files=[entry.path for entry in entries
+                     if entry.is_file() and os.path.splitext(entry.name)[1].lower() in VIDEO_EXTS]
 
     if not video_files:
         print(f"No video files found in '{VIDEO_DIR}'. Please add some videos to test.")
@@ -63,7 +71,8 @@ def test_yolov12_video_detection():
             video_filename=os.path.basename(video_path)
             print(f"\n--- Running detection for video: {video_filename} ---")
 
-            # The 'predict' method with save=True will save the annotated video directly.
+            # With --annotate, the 'predict' method (save=True) will save the annotated video directly;
+            # otherwise no frame is plotted or encoded, only the person counts are collected.
             # 'project' and 'name' control the output folder structure.
             # 'show=False' prevents a display window from popping up for each video frame.
             # 'stream=True' is often used for real-time applications, but for saving a full video,
@@ -75,13 +84,14 @@ def test_yolov12_video_detection():
             person_detections_per_frame=[]  # To store count of persons per frame
 
             # Note: For video, model.predict returns an iterator.
-            # The annotated video file will be saved by Ultralytics automatically due to `save=True`.
+            # The annotated video file will be saved by Ultralytics automatically when `save=True`.
             for frame_idx, result in enumerate(model.predict(
                     source=video_path,
-                    save=True,
+                    save=annotate,  # Plotting/encoding annotated frames costs about as much as yolo12n inference
                     project=INFERENCE_OUTPUT_DIR,
                     name='yolov12_video_detection',  # Output folder: runs/detect/yolov12_video_detection/
                     conf=CONFIDENCE_THRESHOLD,
+                    half=True,  # FP16 on GPU (ignored on CPU)
                     show=False,
                     verbose=False)):  # Set to True for more detailed console output during inference per frame
 
@@ -117,10 +127,15 @@ def test_yolov12_video_detection():
 
     print(f"\n--- Video Detection Test Complete ---")
     print(f"Total videos processed: {total_videos_processed}")
-    output_path=os.path.join(INFERENCE_OUTPUT_DIR, 'yolov12_video_detection')
-    print(f"Annotated videos are saved in: '{output_path}'")
-    print("You can find the processed videos (e.g., 'your_video_name.mp4') inside this folder.")
+    if annotate:
+        output_path=os.path.join(INFERENCE_OUTPUT_DIR, 'yolov12_video_detection')
+        print(f"Annotated videos are saved in: '{output_path}'")
+        print("You can find the processed videos (e.g., 'your_video_name.mp4') inside this folder.")
 
 
 if __name__=="__main__":
-    test_yolov12_video_detection()
\ No newline at end of file
+    parser=argparse.ArgumentParser(description="Run YOLOv12 person detection on test videos.")
+    parser.add_argument('--annotate', action='store_true',
+                        help="also save annotated videos (slower)")
+    args=parser.parse_args()
+    test_yolov12_video_detection(annotate=args.annotate)
\ No newline at end of file
@@ -1,35 +1,113 @@
 # src/utils/image_processing.py
 
-from PIL import Image
+import cv2
+import numpy as np
 
+try:
+    # Optional: JIT-compiled batch crop path (pip install numba)
+    import numba
+except ImportError:
+    numba = None
 
-def pad_to_square_and_resize(image: Image.Image, target_size: int, fill_color=(0, 0, 0)) -> Image.Image:
+HAS_NUMBA = numba is not None
+
+
+def pad_to_square_and_resize(image: np.ndarray, target_size: int, fill_color=(0, 0, 0)) -> np.ndarray:
     """
     Pads an image to a square aspect ratio and then resizes it to a target square dimension.
     Preserves aspect ratio by adding padding bars.
 
+    The crop is resized once, straight into the centre of the preallocated square output,
+    so no intermediate padded image is built.
+
     Args:
-        image (PIL.Image.Image): The input image to process.
+        image (np.ndarray): The input image to process (H x W or H x W x C, e.g. a numpy crop).
         target_size (int): The desired square dimension (e.g., 224 for 224x224).
-        fill_color (tuple): RGB tuple for the color of the padding bars (default: black).
+        fill_color (tuple): Color of the padding bars, in the image's channel order (default: black).
 
     Returns:
-        PIL.Image.Image: The processed image, square and resized to target_size.
+        np.ndarray: The processed image, square and resized to target_size.
     """
-    width, height=image.size
+    height, width=image.shape[:2]
     max_dim=max(width, height)
+    scale=target_size/max_dim
+
+    # Size of the resized crop inside the square, centered like the padding bars
+    new_width=max(1, round(width*scale))
+    new_height=max(1, round(height*scale))
+    offset_x=(target_size-new_width)//2
+    offset_y=(target_size-new_height)//2
+
+    # Square output filled with the padding color
+    output=np.empty((target_size, target_size)+image.shape[2:], dtype=image.dtype)
+    output[...]=fill_color if image.ndim==3 else fill_color[0]
+
+    # Resize into the centre region; area averaging when shrinking, Lanczos when enlarging
+    interpolation=cv2.INTER_AREA if scale<1 else cv2.INTER_LANCZOS4
+    cv2.resize(image, (new_width, new_height),
+               dst=output[offset_y:offset_y+new_height, offset_x:offset_x+new_width],
+               interpolation=interpolation)
+    return output
+
+def _crop_pad_resize_nearest(image, boxes, fill, out):
+    """
+    Kernel of crop_pad_resize_batch: for every box, samples the square-padded crop straight from
+    the image into out[k] (nearest neighbour, pixel centres), without building the crop or the padding.
+    """
+    target_size = out.shape[1]
+    for k in _prange(boxes.shape[0]):
+        x1, y1, x2, y2 = boxes[k, 0], boxes[k, 1], boxes[k, 2], boxes[k, 3]
+        width = x2 - x1
+        height = y2 - y1
+        max_dim = max(width, height)
+        # Offset of the crop inside its padded square, as in pad_to_square_and_resize
+        offset_x = (max_dim - width) // 2
+        offset_y = (max_dim - height) // 2
+        for out_y in range(target_size):
+            crop_y = ((2 * out_y + 1) * max_dim) // (2 * target_size) - offset_y
+            for out_x in range(target_size):
+                crop_x = ((2 * out_x + 1) * max_dim) // (2 * target_size) - offset_x
+                if 0 <= crop_y < height and 0 <= crop_x < width:
+                    for c in range(out.shape[3]):
+                        out[k, out_y, out_x, c] = image[y1 + crop_y, x1 + crop_x, c]
+                else:
+                    for c in range(out.shape[3]):
+                        out[k, out_y, out_x, c] = fill[c]
 
-    # Create a new blank square image
-    square_padded_img=Image.new(image.mode, (max_dim, max_dim), fill_color)
 
-    # Calculate paste position to center the original crop
-    paste_x=(max_dim-width)//2
-    paste_y=(max_dim-height)//2
-    square_padded_img.paste(image, (paste_x, paste_y))
+if HAS_NUMBA:
+    _prange = numba.prange
+    _crop_pad_resize_kernel = numba.njit(parallel=True, cache=True)(_crop_pad_resize_nearest)
+else:
+    _prange = range
+    _crop_pad_resize_kernel = None
 
-    # Resize to target classifier size using a high-quality filter
-    final_resized_image=square_padded_img.resize((target_size, target_size), Image.LANCZOS)
-    return final_resized_image
+
+def crop_pad_resize_batch(image: np.ndarray, boxes: np.ndarray, target_size: int, fill_color=(0, 0, 0)) -> np.ndarray:
+    """
+    Crops several boxes of one image, pads each crop to a square and resizes it to target_size.
+
+    With numba installed all crops are produced by one parallel JIT kernel in a single pass
+    (nearest-neighbour sampling); otherwise each crop goes through pad_to_square_and_resize.
+
+    Args:
+        image (np.ndarray): The source image (H x W x C).
+        boxes (np.ndarray): K x 4 integer (x1, y1, x2, y2) boxes, already clamped to the image and non-empty.
+        target_size (int): The desired square dimension (e.g., 224 for 224x224).
+        fill_color (tuple): Color of the padding bars, in the image's channel order (default: black).
+
+    Returns:
+        np.ndarray: K x target_size x target_size x C array of processed crops.
+    """
+    boxes = np.ascontiguousarray(boxes, dtype=np.int64)
+    out = np.empty((len(boxes), target_size, target_size, image.shape[2]), dtype=image.dtype)
+    if _crop_pad_resize_kernel is not None:
+        fill = np.asarray(fill_color, dtype=image.dtype)
+        _crop_pad_resize_kernel(np.ascontiguousarray(image), boxes, fill, out)
+        return out
+    for k, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+        out[k] = pad_to_square_and_resize(image[y1:y2, x1:x2], target_size, fill_color)
+    return out
 
 # You could add other generic image processing functions here in the future
-# e.g., rotate_image, apply_gamma_correction, etc.
\ No newline at end of file
+# e.g., rotate_image, apply_gamma_correction, etc.
@@ -4,6 +4,35 @@ import json
 import os
 import datetime
 
+try:
+    # Optional: C implemented serializer (pip install orjson); the stdlib json module is used otherwise
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(obj):
+    """Lets the stdlib fallback serialize numpy scalars/arrays like orjson does."""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(data, indent: bool = False) -> bytes:
+    """Serializes data to UTF-8 JSON bytes in one call (2-space indentation if indent)."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, default=_json_default).encode('utf-8')
+
+
+def _loads(raw: bytes):
+    """Parses JSON bytes; raises json.JSONDecodeError (orjson's error subclasses it)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
 def load_metadata(filepath: str) -> list:
     """
     Loads metadata from a JSON file. Returns an empty list if file doesn't exist.
@@ -17,8 +46,8 @@ def load_metadata(filepath: str) -> list:
     if not os.path.exists(filepath):
         return []
     try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        with open(filepath, 'rb') as f:
+            return _loads(f.read())
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON from '{filepath}': {e}. Returning empty list.")
         return []
@@ -29,18 +58,73 @@ def load_metadata(filepath: str) -> list:
 def save_metadata(data: list, filepath: str):
     """
     Saves metadata (a list of dictionaries) to a JSON file.
+    The whole document is serialized first and written with a single write call.
 
     Args:
         data (list): The list of dictionaries to save.
         filepath (str): The path to the output JSON metadata file.
     """
     try:
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+        buf = _dumps(data, indent=True)
+        with open(filepath, 'wb') as f:
+            f.write(buf)
     except Exception as e:
         print(f"Error saving metadata to '{filepath}': {e}")
 
-def update_metadata_entry(metadata: list, crop_id: str, updates: dict) -> list:
+def append_jsonl(f, entry: dict):
+    """
+    Appends one metadata entry as a single JSON Lines record.
+
+    Args:
+        f: A file opened for binary writing ('wb' or 'ab').
+        entry (dict): The metadata entry to write.
+    """
+    f.write(_dumps(entry) + b'\n')
+
+def load_jsonl(filepath: str) -> list:
+    """
+    Loads metadata from a JSON Lines file (one entry per line). Returns an empty list if file doesn't exist.
+    Lines that cannot be decoded (e.g. a record cut off by an interrupted run) are skipped.
+
+    Args:
+        filepath (str): The path to the JSONL metadata file.
+
+    Returns:
+        list: A list of dictionaries representing the metadata.
+    """
+    if not os.path.exists(filepath):
+        return []
+    entries = []
+    try:
+        with open(filepath, 'rb') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(_loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Error decoding JSON on line {line_number} of '{filepath}': {e}. Skipping line.")
+    except Exception as e:
+        print(f"Error loading metadata from '{filepath}': {e}. Returning entries read so far.")
+    return entries
+
+def build_metadata_index(metadata: list) -> dict:
+    """
+    Builds a crop_id -> list position index for O(1) lookups.
+    If a crop_id occurs more than once, the first entry wins (as with a linear scan).
+
+    Args:
+        metadata (list): The list of dictionaries (metadata).
+
+    Returns:
+        dict: Mapping of crop_id to its index in metadata.
+    """
+    index = {}
+    for i, entry in enumerate(metadata):
+        index.setdefault(entry.get("crop_id"), i)
+    return index
+
+def update_metadata_entry(metadata: list, crop_id: str, updates: dict, index: dict = None) -> list:
     """
     Updates a specific entry in the metadata list identified by crop_id.
     Adds a 'last_updated_timestamp' to the entry.
@@ -50,20 +134,60 @@ def update_metadata_entry(metadata: list, crop_id: str, updates: dict) -> list:
         metadata (list): The list of dictionaries (metadata).
         crop_id (str): The unique identifier for the crop to update.
         updates (dict): A dictionary of fields and new values to update.
+        index (dict, optional): crop_id -> position index (see build_metadata_index);
+            avoids scanning the whole list on every update.
 
     Returns:
         list: The metadata list with the specified entry updated.
     """
-    found = False
-    for entry in metadata:
-        if entry.get("crop_id") == crop_id:
-            entry.update(updates)
-            entry['last_updated_timestamp'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
-            found = True
-            break
-    if not found:
+    if index is not None:
+        i = index.get(crop_id)
+        entry = metadata[i] if i is not None else None
+    else:
+        entry = next((e for e in metadata if e.get("crop_id") == crop_id), None)
+
+    if entry is None:
         print(f"Warning: Crop ID '{crop_id}' not found in metadata for update.")
+        return metadata
+    entry.update(updates)
+    entry['last_updated_timestamp'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
     return metadata
 
+class MetadataStore:
+    """
+    Metadata entries kept together with their crop_id index, so lookups and updates
+    (e.g. while relabeling many crops) are O(1) instead of a scan of the whole list.
+
+    Args:
+        entries (list, optional): Initial entries, e.g. from load_metadata or load_jsonl.
+    """
+
+    def __init__(self, entries: list = None):
+        self.entries = []
+        self.index = {}
+        for entry in entries or []:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, entry: dict):
+        """Appends an entry and indexes it by its crop_id."""
+        self.index.setdefault(entry.get("crop_id"), len(self.entries))
+        self.entries.append(entry)
+
+    def get(self, crop_id: str):
+        """Returns the entry for crop_id, or None if it is unknown."""
+        i = self.index.get(crop_id)
+        return self.entries[i] if i is not None else None
+
+    def update(self, crop_id: str, updates: dict):
+        """Updates the entry for crop_id (see update_metadata_entry)."""
+        update_metadata_entry(self.entries, crop_id, updates, self.index)
+
+    def save(self, filepath: str):
+        """Saves all entries to a JSON file (see save_metadata)."""
+        save_metadata(self.entries, filepath)
+
 # Add other metadata management functions here in the future
 # e.g., filter_metadata, merge_metadata, etc.
\ No newline at end of file